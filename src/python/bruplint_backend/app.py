@@ -1,15 +1,44 @@
-from cityhash import CityHash32
+from blob_store import BlobStore
+from cache import LruByteCache
+from compression import IDENTITY, compress, decompress, default_encoding, iter_compress, iter_decompress, slice_chunks
+from content_hash import HASH_ID_MASK, digest_chunks, hash_id_for, spool
 from datetime import datetime
+from diff import DIFF_TYPES, SIDES, serialize_diff
+from evaluation import ViewEvaluator
+from fetcher import FetchError, Fetcher
 from flask import Flask, Response, render_template, request, make_response
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from os import makedirs
-from pyoxigraph import parse as parseRdf
+from formats import EXTENSIONS, GRAPH_TYPES, as_turtle, serialize_quads, type_for_extension, type_for_mime_type
+from graph_stats import GraphStats, graph_stats, graph_summary
+from graph_store import GraphStore
+from hashlib import sha256
+from jobs import FAILED, SUCCEEDED, Job, JobQueue
+from migrations import add_missing_columns, add_missing_indexes, missing_indexes
+from os import cpu_count, makedirs, path
+from pipeline import Inference, PipelineRun, dump_nquads, explain, pipeline_key, plan_pipeline, resume_pipeline
+from pyoxigraph import DefaultGraph, NamedNode, Quad, Store, parse
 from secrets import token_urlsafe
-from typing import Any, Mapping, Optional
-from urllib.parse import urljoin
-from urllib.request import urlopen
+from sparql import RESULT_TYPES, execute_query, normalize_query, query_form, rewrite_type_paths
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from storage import SQLITE_PRAGMAS, engine_options, install_sqlite_pragmas, is_sqlite
+from streaming import CHUNK_SIZE, iter_blob, ranged_response
+from terms import TermTableCache
+from typing import Any, Callable, Iterator, Mapping, NamedTuple, Optional
+from versions import DELTA, SNAPSHOT, apply_delta, encode_delta, graph_changes
+import json
+from urllib.parse import urljoin, urlsplit
 from waitress import serve
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_dict_header
+from werkzeug.wsgi import wrap_file
+
+# `INSERT ... ON CONFLICT DO UPDATE` of the databases supporting it
+UPSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert
+}
 
 def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
     app = Flask(
@@ -30,11 +59,77 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
     except OSError:
         pass
 
+    # Parsed and indexed copies of every graph, so requests never re-parse Turtle
+    graph_store = GraphStore(
+        app.config.get("GRAPH_STORE_PATH", path.join(app.instance_path, "graphs")),
+        app.config.get("ONTOLOGY_PATHS", [])
+    )
+
+    # Remote graphs referenced by Brls
+    fetcher = Fetcher(
+        app.config.get("FETCH_CACHE_PATH", path.join(app.instance_path, "fetched")),
+        connect_timeout = app.config.get("FETCH_CONNECT_TIMEOUT", 5.0),
+        read_timeout = app.config.get("FETCH_READ_TIMEOUT", 30.0),
+        total_timeout = app.config.get("FETCH_TOTAL_TIMEOUT", 120.0),
+        max_size = app.config.get("FETCH_MAX_SIZE", 2 ** 30),
+        pool_size = app.config.get("FETCH_POOL_SIZE", 10),
+        max_cached = app.config.get("FETCH_CACHE_MAX_ENTRIES", 256)
+    )
+
+    # Views are saved in the background, so large graphs don't hold a request thread while they're parsed
+    ingestion = JobQueue(
+        app.config.get("INGEST_WORKERS", cpu_count() or 4),
+        app.config.get("INGEST_JOB_RETENTION", 3600.0)
+    )
+
+    # Outputs of transform pipeline prefixes, keyed by graph hash and the transforms applied
+    transform_cache = LruByteCache(
+        app.config.get("TRANSFORM_CACHE_MAX_ENTRIES", 256),
+        app.config.get("TRANSFORM_CACHE_MAX_BYTES", 256 * (2 ** 20))
+    )
+
+    # Term dictionaries of stored graphs, keyed by their named graph in the graph store
+    term_tables = TermTableCache(app.config.get("TERM_TABLE_CACHE_MAX_ENTRIES", 8))
+
+    # Batches of views are evaluated on a pool of processes, which read checkpoints of the graph store
+    evaluator = ViewEvaluator(
+        graph_store,
+        app.config.get("EVALUATE_SNAPSHOT_PATH", path.join(app.instance_path, "snapshots")),
+        app.config.get("EVALUATE_WORKERS", cpu_count() or 4),
+        app.config.get("EVALUATE_CACHE_MAX_ENTRIES", 64),
+        app.config.get("EVALUATE_CACHE_MAX_BYTES", 64 * (2 ** 20)),
+        app.config.get("TERM_TABLE_CACHE_MAX_ENTRIES", 8)
+    )
+
+    # Serialized query results, keyed by graph hash, normalized query and result type
+    query_cache = LruByteCache(
+        app.config.get("SPARQL_CACHE_MAX_ENTRIES", 1024),
+        app.config.get("SPARQL_CACHE_MAX_BYTES", 64 * (2 ** 20))
+    )
+
+    # SQLite by default, but any database SQLAlchemy supports (e.g. PostgreSQL) can be configured
+    database_uri = app.config.get("SQLALCHEMY_DATABASE_URI", "sqlite:///bruplint.db")
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(
+            database_uri,
+            pool_size = app.config.get("DATABASE_POOL_SIZE", 8),
+            statement_cache_size = app.config.get("SQLITE_STATEMENT_CACHE_SIZE", 256)
+        ),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    }
+
+    # Stored graphs and serializations, named by the digest of their stored bytes
+    blob_store = BlobStore(app.config.get("BLOB_STORE_PATH", path.join(app.instance_path, "blobs")))
+
     db = SQLAlchemy()
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///bruplint.db"
     db.init_app(app)
     CORS(app)
 
+    if is_sqlite(database_uri):
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, {**SQLITE_PRAGMAS, **app.config.get("SQLITE_PRAGMAS", {})})
+
     class User(db.Model):
         __tablename__ = "users"
         username = db.Column(db.Text, primary_key=True, unique=True, nullable=False)
@@ -42,13 +137,37 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
 
     class Graph(db.Model):
         __tablename__ = "graphs"
+        # Short identifier used in URLs, derived from `digest`
         hash_id = db.Column(db.BigInteger, primary_key=True, unique=True, nullable=False)
-        content = db.Column(db.LargeBinary(length = (2 ** 32) - 1), nullable=False)
+        # Hex SHA-256 of the uncompressed content, which graphs are deduplicated by
+        digest = db.Column(db.Text, unique=True, index=True)
+        # Empty since graphs moved to the blob store, and only kept for databases created before
+        content = db.deferred(db.Column(db.LargeBinary(length = (2 ** 32) - 1), nullable=False))
+        # Key of the stored content in the blob store
+        blob_key = db.Column(db.Text)
+        # Codec the content is stored with, as an HTTP content-coding
+        encoding = db.Column(db.Text, nullable=False, server_default=IDENTITY)
+        # Size of the uncompressed content, in bytes
+        size = db.Column(db.BigInteger)
+        # Statistics collected when the graph was stored, see `graph_stats.GraphStats.as_dict()`
+        triple_count = db.Column(db.BigInteger)
+        subject_count = db.Column(db.BigInteger)
+        predicate_count = db.Column(db.BigInteger)
+        stats = db.Column(db.JSON)
+        # Class, predicate and degree counts, see `graph_stats.graph_summary()`
+        summary = db.Column(db.JSON)
+        # Graph the view held before this one was saved over it
+        parent_hash = db.Column(db.BigInteger, db.ForeignKey("graphs.hash_id"))
+        version = db.Column(db.Integer, nullable=False, server_default="1")
+        # Whether `content` is the whole graph, or a delta against the parent (see `versions`)
+        kind = db.Column(db.Text, nullable=False, server_default=SNAPSHOT)
 
         # TODO: MIME type -- revisit
 
     class View(db.Model):
         __tablename__ = "views"
+        # Views are looked up by name, which is unique per user
+        __table_args__ = (db.Index("ix_views_username_display_name", "username", "display_name", unique=True),)
         view_id = db.Column(db.Integer, primary_key=True)
         username = db.Column(db.Text, db.ForeignKey("users.username"), nullable=False)
         display_name = db.Column(db.Text, nullable=False)
@@ -57,9 +176,245 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
 
         # TODO: BRU and BRL constructors as View instance methods?
 
+    # Other serializations of stored graphs, produced from the graph store the first time they're requested
+    class Serialization(db.Model):
+        __tablename__ = "serializations"
+        __table_args__ = (db.UniqueConstraint("hash_id", "type"),)
+        serialization_id = db.Column(db.Integer, primary_key=True)
+        hash_id = db.Column(db.BigInteger, db.ForeignKey("graphs.hash_id"), nullable=False)
+        type = db.Column(db.Text, nullable=False)
+        content = db.deferred(db.Column(db.LargeBinary(length = (2 ** 32) - 1), nullable=False))
+        blob_key = db.Column(db.Text)
+        encoding = db.Column(db.Text, nullable=False, server_default=IDENTITY)
+        size = db.Column(db.BigInteger, nullable=False)
+
     with app.app_context():
         db.create_all()
 
+        if "size" in add_missing_columns(db.engine, Graph.__table__):
+            # Graphs stored before compression was introduced are all uncompressed
+            db.session.execute(
+                db.update(Graph)
+                    .where(Graph.size == None)
+                    .values(size = db.func.length(Graph.content))
+            )
+            db.session.commit()
+
+        add_missing_indexes(db.engine, Graph.__table__)
+        add_missing_columns(db.engine, Serialization.__table__)
+
+        if "ix_views_username_display_name" in missing_indexes(db.engine, View.__table__):
+            # Views saved concurrently before names were unique may be duplicated, the latest save is kept
+            db.session.execute(
+                db.delete(View)
+                    .where(View.view_id.not_in(
+                        db.select(db.func.max(View.view_id))
+                            .group_by(View.username, View.display_name)
+                    ))
+                    .execution_options(synchronize_session = False)
+            )
+            db.session.commit()
+        add_missing_indexes(db.engine, View.__table__)
+
+        # Graphs stored before content digests were introduced are hashed once, streaming their content
+        for hash_id, encoding, stored_size in db.session.execute(
+            db.select(Graph.hash_id, Graph.encoding, db.func.length(Graph.content))
+                .where(Graph.digest == None)
+        ).all():
+            chunks = iter_blob(db.engine, Graph.__table__.c.content, Graph.__table__.c.hash_id, hash_id, 0, stored_size)
+            db.session.execute(
+                db.update(Graph)
+                    .where(Graph.hash_id == hash_id)
+                    .values(digest = digest_chunks(iter_decompress(chunks, encoding)))
+            )
+        db.session.commit()
+
+        # Contents stored in the database before the blob store existed are moved into it, one at a time
+        moved = 0
+        for model, key_name in ((Graph, "hash_id"), (Serialization, "serialization_id")):
+            key_column = getattr(model, key_name)
+            for key, stored_size in db.session.execute(
+                db.select(key_column, db.func.length(model.content))
+                    .where(model.blob_key == None)
+            ).all():
+                chunks = iter_blob(db.engine, model.__table__.c.content, model.__table__.c[key_name], key, 0, stored_size)
+                blob_key, _ = blob_store.put_chunks(chunks)
+                db.session.execute(
+                    db.update(model)
+                        .where(key_column == key)
+                        .values(blob_key = blob_key, content = b"")
+                )
+                db.session.commit()
+                moved += 1
+
+        # Returns the pages the contents took up, which SQLite otherwise keeps
+        if moved > 0 and is_sqlite(database_uri):
+            with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.exec_driver_sql("VACUUM")
+
+    graph_encoding = app.config.get("GRAPH_ENCODING", default_encoding())
+
+    # Versions are stored as deltas, with a full snapshot at least every this many versions
+    snapshot_interval = app.config.get("GRAPH_SNAPSHOT_INTERVAL", 10)
+
+    # Turtle reconstructed from deltas, keyed by graph hash
+    version_cache = LruByteCache(
+        app.config.get("VERSION_CACHE_MAX_ENTRIES", 64),
+        app.config.get("VERSION_CACHE_MAX_BYTES", 256 * (2 ** 20))
+    )
+
+    def ensureGraph(graph: Graph) -> NamedNode:
+        # Graphs are loaded into the graph store the first time they're used, deltas after their parent
+        if graph.kind == DELTA:
+            def reconstruct() -> bytes:
+                parent = db.session.get(Graph, graph.parent_hash)
+                parent_graph_name = ensureGraph(parent)
+                quads = apply_delta(graph_store.store, parent_graph_name, decompress(blob_store.read(graph.blob_key), graph.encoding))
+                return serialize_quads(quads, "n-triples")
+            return graph_store.ensure(graph.hash_id, reconstruct, GRAPH_TYPES["n-triples"])
+        return graph_store.ensure(graph.hash_id, lambda: decompress(blob_store.read(graph.blob_key), graph.encoding))
+
+    def deltaDepth(graph: Graph) -> int:
+        depth = 0
+        while graph.kind == DELTA:
+            depth += 1
+            graph = db.session.get(Graph, graph.parent_hash)
+        return depth
+
+    # Graphs are immutable once stored, so their hash doubles as a strong validator
+    def withValidators(response: Response, etag: str, immutable: bool = False) -> Response:
+        response.set_etag(etag)
+        if immutable:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def notModified(etag: str, immutable: bool = False) -> Optional[Response]:
+        if request.if_none_match.contains_weak(etag):
+            return withValidators(make_response('', 304), etag, immutable)
+        return None
+
+    def serializationIdOr422(hash_id: int, graph_type: str) -> int:
+        serialization_id = db.session.execute(
+            db.select(Serialization.serialization_id)
+                .where(Serialization.hash_id == hash_id)
+                .where(Serialization.type == graph_type)
+        ).scalar()
+
+        if serialization_id != None:
+            return serialization_id
+
+        graph = db.session.get(Graph, hash_id)
+
+        if graph == None:
+            app.aborter(422)
+
+        # Serializing from the graph store avoids parsing the stored Turtle
+        ensureGraph(graph)
+        content = serialize_quads(graph_store.quads(hash_id), graph_type)
+
+        serialization = Serialization(
+            hash_id = hash_id,
+            type = graph_type,
+            content = b"",
+            blob_key = blob_store.put(compress(content, graph_encoding)),
+            encoding = graph_encoding,
+            size = len(content)
+        )
+
+        db.session.add(serialization)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Produced concurrently by another request
+            db.session.rollback()
+            return serializationIdOr422(hash_id, graph_type)
+
+        return serialization.serialization_id
+
+    def reconstructedResponse(hash_id: int, immutable: bool = False) -> Response:
+        etag = str(hash_id)
+        cached = notModified(etag, immutable)
+        if cached != None:
+            return cached
+
+        content = version_cache.get(hash_id)
+        if content == None:
+            graph = db.session.get(Graph, hash_id)
+            ensureGraph(graph)
+            content = serialize_quads(graph_store.quads(hash_id), "turtle")
+            version_cache.put(hash_id, content)
+
+        response = ranged_response(request, len(content), lambda start, stop: iter([content[start:stop]]), GRAPH_TYPES["turtle"], etag)
+        return withValidators(response, etag, immutable)
+
+    def graphResponse(hash_id: int, graph_type: str = "turtle", immutable: bool = False) -> Response:
+        # Turtle is the uploaded graph itself (unless it was stored as a delta), other types are derived from it
+        if graph_type == "turtle":
+            kind = db.session.execute(
+                db.select(Graph.kind)
+                    .where(Graph.hash_id == hash_id)
+            ).scalar()
+
+            if kind == None:
+                app.aborter(422)
+            elif kind == DELTA:
+                return reconstructedResponse(hash_id, immutable)
+
+            model, key_column, key = Graph, Graph.__table__.c.hash_id, hash_id
+            base_etag = str(hash_id)
+        else:
+            model, key_column = Serialization, Serialization.__table__.c.serialization_id
+            key = serializationIdOr422(hash_id, graph_type)
+            base_etag = f"{hash_id}.{EXTENSIONS[graph_type]}"
+
+        # Only metadata is read from the database, the content itself is read from the blob store
+        graph = db.session.execute(
+            db.select(model.blob_key, model.encoding, model.size)
+                .where(key_column == key)
+        ).first()
+
+        if graph == None:
+            app.aborter(422)
+
+        blob_key, encoding, size = graph
+        stored_size = blob_store.size(blob_key)
+        content_type = GRAPH_TYPES[graph_type]
+        environ = request.environ
+
+        def readStored(start: int, stop: int):
+            # Whole blobs are handed to the server's `wsgi.file_wrapper`, which sends them without copying through Python
+            if start == 0 and stop == stored_size:
+                return wrap_file(environ, open(blob_store.blob_path(blob_key), "rb"), CHUNK_SIZE)
+            return blob_store.iter_range(blob_key, start, stop)
+
+        # Stored bytes are sent as-is whenever the client accepts their encoding
+        send_encoded = encoding == IDENTITY or request.accept_encodings[encoding] > 0
+
+        # Each encoding is a different representation, so needs its own strong ETag
+        etag = base_etag if not send_encoded or encoding == IDENTITY else f"{base_etag}-{encoding}"
+        cached = notModified(etag, immutable)
+        if cached != None:
+            cached.headers["Vary"] = "Accept-Encoding"
+            return cached
+
+        if send_encoded:
+            response = ranged_response(request, stored_size, readStored, content_type, etag)
+            if encoding != IDENTITY and response.status_code != 416:
+                response.headers["Content-Encoding"] = encoding
+        else:
+            response = ranged_response(
+                request,
+                size,
+                lambda start, stop: slice_chunks(iter_decompress(blob_store.iter_range(blob_key, 0, stored_size), encoding), start, stop),
+                content_type,
+                etag
+            )
+
+        response.headers["Vary"] = "Accept-Encoding"
+        return withValidators(response, etag, immutable)
+
     def getUserOr4XX(username: str, api_key: Optional[str] = None) -> User:
         user = db.get_or_404(User, username)
         if api_key == None:
@@ -68,6 +423,69 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
             app.aborter(401) # Incorrect API key
         return user
 
+    # Graph and transforms of a view, as cached by `viewOr422()`
+    class SavedView(NamedTuple):
+        view_hash: int
+        transforms: list
+
+    # Views by username and display name, dropped whenever the view is saved
+    view_cache = LruByteCache(
+        app.config.get("VIEW_CACHE_MAX_ENTRIES", 4096),
+        app.config.get("VIEW_CACHE_MAX_BYTES", 16 * (2 ** 20))
+    )
+
+    def viewOr422(username: str, display_name: str) -> SavedView:
+        key = (username, display_name)
+        cached = view_cache.get(key)
+        if cached != None:
+            return SavedView(*json.loads(cached))
+
+        generation = view_cache.generation
+        view = db.session.execute(
+            db.select(View.view_hash, View.transforms)
+                .where(View.username == username)
+                .where(View.display_name == display_name)
+        ).first()
+
+        if view == None:
+            app.aborter(422)
+
+        saved_view = SavedView(view.view_hash, view.transforms)
+        view_cache.put(key, json.dumps(saved_view).encode("utf-8"), generation)
+        return saved_view
+
+    def saveView(username: str, display_name: str, view_hash: int, transforms: list) -> None:
+        values = {
+            "username": username,
+            "display_name": display_name,
+            "view_hash": view_hash,
+            "transforms": transforms
+        }
+
+        # Saving over a view updates it in place, in a single statement where the database supports it
+        dialect = db.engine.dialect.name
+        if dialect in UPSERTS:
+            statement = UPSERTS[dialect](View.__table__).values(**values)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements = [View.__table__.c.username, View.__table__.c.display_name],
+                set_ = {
+                    "view_hash": statement.excluded.view_hash,
+                    "transforms": statement.excluded.transforms
+                }
+            ))
+        else:
+            updated = db.session.execute(
+                db.update(View)
+                    .where(View.username == username)
+                    .where(View.display_name == display_name)
+                    .values(view_hash = view_hash, transforms = transforms)
+            )
+            if updated.rowcount == 0:
+                db.session.add(View(**values))
+        db.session.commit()
+
+        view_cache.remove((username, display_name))
+
     # TODO: Ask Dr. Fierro - should users be able to add/delete themselves or some admin has this responsibilty?
     # Deletes, retrieves, and saves a user
     @app.route("/user/<username>", methods=["DELETE", "GET", "PUT"])
@@ -98,22 +516,69 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
             # TODO: Delete associated views
             return make_response('', 204)
 
-    # Retrieve all views saved by a user
+    # First string after every string starting with `prefix`, in code point order
+    def prefixEnd(prefix: str) -> Optional[str]:
+        prefix = prefix.rstrip("\U0010FFFF")
+        if prefix == '':
+            return None
+        # Surrogates can't be encoded, so are skipped
+        last = ord(prefix[-1]) + 1
+        return prefix[:-1] + chr(0xE000 if 0xD800 <= last < 0xE000 else last)
+
+    # Retrieve the views saved by a user, a page at a time in order of name
     @app.route("/view/<username>/views.json", methods=["GET"])
     def get_views_json(username: str) -> Response:
-        views = db.session.execute(
-            db.select(View)
-                .where(View.username == username)
-        )
+        limit = request.args.get("limit", str(app.config.get("VIEWS_PAGE_SIZE", 100)))
+        if not limit.isdigit() or not 0 < int(limit) <= app.config.get("VIEWS_PAGE_MAX_SIZE", 1000):
+            app.aborter(400) # Invalid page size
+        limit = int(limit)
+
+        # Pages continue after the last name of the previous page, so are found with a seek on the index
+        after = request.args.get("after")
+        prefix = request.args.get("prefix", '')
+
+        # Names with a prefix are a range of the index, which `LIKE` wouldn't use
+        matching = View.username == username
+        if prefix != '':
+            matching = db.and_(matching, View.display_name >= prefix)
+            prefix_end = prefixEnd(prefix)
+            if prefix_end != None:
+                matching = db.and_(matching, View.display_name < prefix_end)
 
-        views_list = []
+        # Counted over the index alone, without reading the views themselves
+        total = db.session.execute(
+            db.select(db.func.count())
+                .select_from(View)
+                .where(matching)
+        ).scalar()
 
-        for v in views:
-            views_list.append({"name": v[0].display_name, "url": app.url_for("get_view_json", username = username, display_name = v[0].display_name)})
+        page = db.select(View.display_name).where(matching)
+        if after != None:
+            page = page.where(View.display_name > after)
+
+        # One more name than the page holds tells whether there's a next page
+        names = db.session.execute(
+            page.order_by(View.display_name).limit(limit + 1)
+        ).scalars().all()
+
+        next_url = None
+        if len(names) > limit:
+            names = names[:limit]
+            next_url = app.url_for("get_views_json",
+                username = username,
+                after = names[-1],
+                limit = limit,
+                **({"prefix": prefix} if prefix != '' else {})
+            )
 
         return app.json.response(
             username = username,
-            views = views_list
+            views = [
+                {"name": name, "url": app.url_for("get_view_json", username = username, display_name = name)}
+                    for name in names
+            ],
+            total = total,
+            next = next_url
         )
 
     # Save view
@@ -123,122 +588,570 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
         if request.headers.get("Content-Type") != "application/json":
             app.aborter(400) # Content is not JSON
 
-        if isBru(request.json):
-            graph_content = bytes(request.json.get("graph").get("content").get("data"), "utf-8")
-        elif isBrl(request.json):
-            graph_source = request.json.get("graph").get("url")
-            location = urljoin(request.host_url, graph_source) if graph_source[0] == '/' else graph_source
-            try:
-                with urlopen(location) as graph:
-                    graph_content = graph.read()
-            except:
-                app.aborter(400) # Failed to read from URL
-        else:
+        if not isBru(request.json) and not isBrl(request.json):
             app.aborter(400) # Content is not a Bru nor a Brl
 
-        user = getUserOr4XX(username)
+        getUserOr4XX(username)
 
-        hash_id = CityHash32(graph_content)
+        # Ingestion runs outside of the request, so anything it needs from the request is captured now
+        view = request.json
+        host_url = request.host_url
+        view_url = app.url_for("get_view_json", username = username, display_name = display_name)
 
-        existing_graph = db.session.get(Graph, hash_id)
+        job = ingestion.submit(lambda job: ingestView(job, username, display_name, view, host_url, view_url))
 
-        if existing_graph == None:
-            # Assert that it is possible to parse before trying to save
-            try:
-                list(parseRdf(graph_content, "text/turtle"))
-            except:
-                app.aborter(400) # Graph content is not Turtle-formatted
+        # Clients that would rather not poll can wait for the job with `Prefer: wait=<seconds>` (RFC 7240)
+        prefer = parse_dict_header(request.headers.get("Prefer", ''))
+        wait = prefer.get("wait", '')
+        if wait.isdigit() and job.wait(min(int(wait), app.config.get("INGEST_MAX_WAIT", 60))):
+            if job.error != None:
+                raise job.error
+            return make_response('', 201)
 
-            working_graph = Graph(content=graph_content, hash_id=hash_id)
+        response = app.json.response(**jobJson(job))
+        response.status_code = 202
+        response.headers["Location"] = app.url_for("get_job_json", job_id = job.job_id)
+        return response
 
-            db.session.add(working_graph)
-            db.session.commit()
-        else:
-            working_graph = existing_graph
+    def localGraph(location: str, host_url: str) -> Optional[Graph]:
+        # Finds the stored graph a URL of this server's `/graph/<hash_id>/graph` routes serves
+        url, host = urlsplit(location), urlsplit(host_url)
+        if (url.scheme, url.netloc) != (host.scheme, host.netloc) or url.query:
+            return None
 
-        exists = db.session.execute(
-            db.select(View)
-                .where(View.username == username)
-                .where(View.display_name == display_name)
-        ).first()
+        try:
+            endpoint, arguments = app.url_map.bind(host.netloc).match(url.path, method = "GET")
+        except HTTPException:
+            return None
 
-        if exists != None:
-            db.session.delete(exists[0])
+        if endpoint not in ("get_hashed_graph", "get_negotiated_graph"):
+            return None
+        return db.session.get(Graph, arguments["hash_id"])
 
-        new_view = View(
-                username = user.username,
-                display_name = display_name,
-                view_hash = working_graph.hash_id,
-                transforms = request.json.get("transforms")
-            )
+    def ingestView(job: Job, username: str, display_name: str, view: dict, host_url: str, view_url: str) -> str:
+        with app.app_context():
+            # The user may have been deleted while the job was queued
+            user = db.session.get(User, username)
+            if user == None:
+                app.aborter(404)
 
-        db.session.add(new_view)
-        db.session.commit()
+            # Graph content is hashed as it's read, and only kept in memory while it's small
+            job.set_stage("reading")
+            if isBru(view):
+                graph_digest, graph_size, graph_file = spool([bytes(view.get("graph").get("content").get("data"), "utf-8")])
+            else:
+                graph_source = view.get("graph").get("url")
+                location = urljoin(host_url, graph_source) if graph_source[0] == '/' else graph_source
+
+                # Views loaded from this server point at a serialization of their graph, whose bytes differ from it
+                local_graph = localGraph(location, host_url)
+                if local_graph != None:
+                    job.set_stage("saving")
+                    saveView(user.username, display_name, local_graph.hash_id, view.get("transforms"))
+                    return view_url
+
+                try:
+                    fetched = fetcher.fetch(location)
+                except FetchError:
+                    app.aborter(400) # Failed to read from URL
+                graph_digest, graph_size, graph_file = fetched.digest, fetched.size, open(fetched.path, "rb")
+
+            # Graphs are stored as Turtle, whichever type they were sent as
+            if view.get("graph").get("type") == "n-quads":
+                try:
+                    graph_content = as_turtle(graph_file.read(), "n-quads")
+                except SyntaxError:
+                    app.aborter(400) # Graph content is not formatted as its type
+                graph_digest, graph_size, graph_file = spool([graph_content])
+
+            existing_graph = db.session.execute(
+                db.select(Graph)
+                    .where(Graph.digest == graph_digest)
+            ).scalar()
+
+            if existing_graph == None:
+                # Identifiers only have 63 bits, so probe past any (unlikely) collision
+                hash_id = hash_id_for(graph_digest)
+                while db.session.get(Graph, hash_id) != None:
+                    hash_id = (hash_id + 1) & HASH_ID_MASK
+
+                # Content is validated as it streams through the parser, collecting its statistics on the way,
+                # so nothing is written to the graph store unless all of it parses
+                job.set_stage("parsing")
+                try:
+                    stats = graph_stats(parse(graph_file, "text/turtle"))
+                except SyntaxError:
+                    app.aborter(400) # Graph content is not Turtle-formatted
 
-        return make_response('', 201)
+                graph_file.seek(0)
+                graph_store.add(hash_id, graph_file)
+                # Triples repeated in the content are only stored once
+                stats.triples = graph_store.count(hash_id)
+
+                job.set_stage("inferring")
+                graph_store.infer(hash_id)
+
+                job.set_stage("analysing")
+                analysis = graphAnalysis(hash_id, stats)
+
+                # Saving over a view stores only what changed since the graph it held
+                job.set_stage("versioning")
+                previous = db.session.execute(
+                    db.select(Graph)
+                        .join(View, View.view_hash == Graph.hash_id)
+                        .where(View.username == username)
+                        .where(View.display_name == display_name)
+                ).scalar()
+
+                kind, delta = SNAPSHOT, None
+                if previous != None and deltaDepth(previous) + 1 < snapshot_interval:
+                    delta = encode_delta(graph_store.store, ensureGraph(previous), graph_store.graph_name(hash_id))
+                    # Heavily edited graphs can have deltas larger than themselves
+                    if len(delta) < graph_size:
+                        kind = DELTA
+
+                job.set_stage("storing")
+                if kind == DELTA:
+                    blob_key, stored_size = blob_store.put(compress(delta, graph_encoding)), len(delta)
+                else:
+                    graph_file.seek(0)
+                    chunks = iter(lambda: graph_file.read(CHUNK_SIZE), b"")
+                    blob_key, stored_size = blob_store.put_chunks(iter_compress(chunks, graph_encoding))[0], graph_size
+
+                working_graph = Graph(
+                    content = b"",
+                    blob_key = blob_key,
+                    encoding = graph_encoding,
+                    size = stored_size,
+                    digest = graph_digest,
+                    hash_id = hash_id,
+                    parent_hash = None if previous == None else previous.hash_id,
+                    version = 1 if previous == None else previous.version + 1,
+                    kind = kind,
+                    **analysis
+                )
+
+                db.session.add(working_graph)
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Stored concurrently by another request
+                    db.session.rollback()
+                    working_graph = db.session.execute(
+                        db.select(Graph)
+                            .where(Graph.digest == graph_digest)
+                    ).scalar_one()
+            else:
+                working_graph = existing_graph
+
+            job.set_stage("saving")
+            saveView(user.username, display_name, working_graph.hash_id, view.get("transforms"))
+
+            return view_url
+
+    def jobJson(job: Job) -> dict:
+        status = None
+        if job.state == SUCCEEDED:
+            status = 201
+        elif job.state == FAILED:
+            status = job.error.code if isinstance(job.error, HTTPException) else 500
+
+        return {
+            "id": job.job_id,
+            "state": job.state,
+            "stage": job.stage,
+            # Status code the save would have had if it had been made synchronously
+            "status": status,
+            "view": job.result
+        }
+
+    # Progress of a view being saved
+    @app.route("/bruplint/job/<job_id>.json", methods=["GET"])
+    def get_job_json(job_id: str) -> Response:
+        job = ingestion.get(job_id)
+
+        if job == None:
+            app.aborter(404) # Unknown, or finished long enough ago to have been forgotten
+
+        response = app.json.response(**jobJson(job))
+        response.headers["Cache-Control"] = "no-store"
+        return response
 
     # Retrieve view from database
     @app.route("/view/<username>/<display_name>/view.json", methods=["GET"])
     def get_view_json(username: str, display_name: str) -> Response:
+        # TODO: Should aborters return non-HTML content?
+        view = viewOr422(username, display_name)
 
-        view = db.session.execute(
-            db.select(View)
-                .where(View.username == username)
-                .where(View.display_name == display_name)
-        ).first()
+        # Clients able to parse a faster format than Turtle can request it with `?type=`
+        graph_type = request.args.get("type", "turtle")
+        if graph_type not in GRAPH_TYPES:
+            app.aborter(400)
 
-        if view == None:
-            # TODO: Should aborters return non-HTML content?
-            app.aborter(422)
+        etag = sha256(json.dumps(
+            [view.view_hash, view.transforms, graph_type],
+            sort_keys = True,
+            separators = (',', ':')
+        ).encode("utf-8")).hexdigest()[:32]
 
-        return app.json.response(
+        cached = notModified(etag)
+        if cached != None:
+            return cached
+
+        # The hash-addressed graph URL can be cached indefinitely by clients
+        return withValidators(app.json.response(
             format = "brl",
             graph = {
                 # TODO: Should "type" be actual MIME types?
-                "type": "turtle",
-                "url": app.url_for("get_graph_ttl",
-                    username = username,
-                    display_name = display_name
+                "type": graph_type,
+                "url": app.url_for("get_hashed_graph",
+                    hash_id = view.view_hash,
+                    extension = EXTENSIONS[graph_type]
                 )
             },
-            transforms = view[0].transforms
-        )
+            transforms = view.transforms
+        ), etag)
 
     # TODO: In future, when other types can be supported, should this return 404 on non-Turtle types?
     # TODO: Alternatively, headers have an "Accepts" field that can be a list of MIME types
     @app.route("/view/<username>/<display_name>/graph.ttl", methods=["GET"])
     def get_graph_ttl(username: str, display_name: str) -> Response:
+        view = viewOr422(username, display_name)
 
-        # TODO: Deduplicate
-        view = db.session.execute(
-            db.select(View)
-                .where(View.username == username)
-                .where(View.display_name == display_name)
-        ).first()
+        # Views can be re-saved over a different graph, so this URL must be revalidated
+        return graphResponse(view.view_hash)
 
-        if view == None:
+    @app.route("/graph/<int:hash_id>/graph.<extension>", methods=["GET"])
+    def get_hashed_graph(hash_id: int, extension: str) -> Response:
+        graph_type = type_for_extension(extension)
+        if graph_type == None:
+            app.aborter(404)
+
+        return graphResponse(hash_id, graph_type, immutable = True)
+
+    # Serves whichever supported type the client's `Accept` header prefers
+    @app.route("/graph/<int:hash_id>/graph", methods=["GET"])
+    def get_negotiated_graph(hash_id: int) -> Response:
+        mime_type = request.accept_mimetypes.best_match(list(GRAPH_TYPES.values()), default = GRAPH_TYPES["turtle"])
+
+        response = graphResponse(hash_id, type_for_mime_type(mime_type), immutable = True)
+        response.headers["Vary"] = "Accept, Accept-Encoding"
+        return response
+
+    # Columns of `Graph` computed from a graph once it's in the graph store
+    def graphAnalysis(hash_id: int, stats: Optional[GraphStats] = None) -> dict:
+        # Statistics are collected from the graph store unless they were while validating the upload
+        if stats == None:
+            stats = graph_stats(graph_store.quads(hash_id))
+        stats = stats.as_dict()
+        return {
+            "triple_count": stats["triples"],
+            "subject_count": stats["subjects"],
+            "predicate_count": stats["predicates"],
+            "stats": stats,
+            "summary": graph_summary(graph_store.store, graph_store.graph_name(hash_id))
+        }
+
+    def analysedGraphOr422(hash_id: int) -> Graph:
+        graph = db.session.get(Graph, hash_id)
+
+        if graph == None:
             app.aborter(422)
 
-        graph = db.session.get(Graph, view[0].view_hash)
+        # Graphs stored before they were analysed are analysed the first time it's needed
+        if graph.stats == None or graph.summary == None:
+            ensureGraph(graph)
+            for column, value in graphAnalysis(hash_id).items():
+                setattr(graph, column, value)
+            db.session.commit()
+
+        return graph
+
+    @app.route("/graph/<int:hash_id>/stats.json", methods=["GET"])
+    def get_graph_stats(hash_id: int) -> Response:
+        etag = f"{hash_id}-stats"
+        cached = notModified(etag, immutable = True)
+        if cached != None:
+            return cached
+
+        return withValidators(app.json.response(**analysedGraphOr422(hash_id).stats), etag, immutable = True)
+
+    # Lets landing pages show what a graph contains without downloading it
+    @app.route("/graph/<int:hash_id>/summary.json", methods=["GET"])
+    def get_graph_summary(hash_id: int) -> Response:
+        etag = f"{hash_id}-summary"
+        cached = notModified(etag, immutable = True)
+        if cached != None:
+            return cached
+
+        return withValidators(app.json.response(**analysedGraphOr422(hash_id).summary), etag, immutable = True)
+
+    # Graphs are immutable, so the results of a query over one never go stale
+    @app.route("/graph/<int:hash_id>/sparql", methods=["GET", "POST"])
+    def graph_sparql(hash_id: int) -> Response:
+        if request.method == "GET":
+            query = request.args.get("query")
+        elif request.mimetype == "application/sparql-query":
+            query = request.get_data(as_text = True)
+        else:
+            query = request.form.get("query")
+
+        if query == None:
+            app.aborter(400) # Missing query
+
+        query = normalize_query(query)
+
+        # Inferred types can be opted into, which also turns `rdf:type/rdfs:subClassOf*` paths into lookups
+        inferred = request.values.get("inferred") == "true"
+        if inferred:
+            query = rewrite_type_paths(query)
+
+        match query_form(query):
+            case "CONSTRUCT" | "DESCRIBE":
+                mime_types = list(GRAPH_TYPES.values())
+            case "ASK":
+                mime_types = [RESULT_TYPES["json"]]
+            case _:
+                mime_types = list(RESULT_TYPES.values())
+        mime_type = request.accept_mimetypes.best_match(mime_types, default = mime_types[0])
+
+        # Inferred types change with the ontology, so those results are versioned by it and must be revalidated
+        ontology_version = graph_store.ontology_version if inferred else None
+        etag = sha256(json.dumps(
+            [hash_id, query, mime_type, inferred, ontology_version],
+            separators = (',', ':')
+        ).encode("utf-8")).hexdigest()[:32]
+
+        cached = notModified(etag, immutable = not inferred)
+        if cached != None:
+            cached.headers["Vary"] = "Accept"
+            return cached
+
+        key = (hash_id, query, mime_type, ontology_version)
+        results = query_cache.get(key)
+
+        if results == None:
+            graph = db.session.get(Graph, hash_id)
+
+            if graph == None:
+                app.aborter(422)
+
+            graph_name = ensureGraph(graph)
+            if inferred:
+                graph_name = [graph_name, graph_store.infer(hash_id)]
+            try:
+                results = execute_query(graph_store.store, query, graph_name, mime_type)
+            except (SyntaxError, ValueError):
+                app.aborter(400) # Query is invalid
+
+            query_cache.put(key, results)
+
+        response = make_response(results, 200)
+        response.headers["Content-Type"] = mime_type
+        response.headers["Vary"] = "Accept"
+        return withValidators(response, etag, immutable = not inferred)
+
+    def runPipeline(view_hash: int, transforms: list) -> PipelineRun:
+        graph = db.session.get(Graph, view_hash)
 
         if graph == None:
             app.aborter(422)
 
-        response = make_response(graph.content, 200)
-        response.headers["Content-Type"] = "text/turtle"
-        return response
+        graph_name = ensureGraph(graph)
+        return resume_pipeline(
+            graph.hash_id,
+            transforms,
+            graph_store.store,
+            transform_cache,
+            graph_name,
+            Inference(graph_store.store, graph_store.infer(graph.hash_id)),
+            term_tables
+        )
 
-    @app.route("/view/<username>/<display_name>", methods=["GET"])
-    def get_main_page(username: str, display_name: str) -> Response:
-        view = db.session.execute(
-            db.select(View)
-                .where(View.username == username)
-                .where(View.display_name == display_name)
-        ).first()
+    def filteredStore(view: SavedView) -> Store:
+        return runPipeline(view.view_hash, view.transforms).store
 
-        if view == None:
+    # Runs the view's transforms server-side, so clients don't need to filter the full graph themselves
+    # Served as N-Quads, as the placeholders of partially matched quads are in their own graph. Without any it's also valid Turtle
+    @app.route("/view/<username>/<display_name>/filtered.nq", methods=["GET"])
+    @app.route("/view/<username>/<display_name>/filtered.ttl", methods=["GET"])
+    def get_filtered_graph(username: str, display_name: str) -> Response:
+        view = viewOr422(username, display_name)
+
+        etag = pipeline_key(view.view_hash, view.transforms, graph_store.ontology_version)
+        cached = notModified(etag)
+        if cached != None:
+            return cached
+
+        response = make_response(dump_nquads(filteredStore(view)), 200)
+        response.headers["Content-Type"] = GRAPH_TYPES["n-quads"]
+        return withValidators(response, etag)
+
+    # Evaluates many views at once, spread over the evaluator's worker processes
+    @app.route("/views/evaluate", methods=["POST"])
+    def post_views_evaluate() -> Response:
+        if request.headers.get("Content-Type") != "application/json":
+            app.aborter(400) # Content is not JSON
+
+        entries = request.json.get("views") if isinstance(request.json, dict) else None
+        if not isinstance(entries, list) or len(entries) > app.config.get("EVALUATE_MAX_VIEWS", 64):
+            app.aborter(400)
+        if not all(isinstance(entry, dict) and isinstance(entry.get("username"), str) and isinstance(entry.get("name"), str) for entry in entries):
+            app.aborter(400)
+
+        # Graphs are all loaded first, as workers only see graphs that were stored when they started
+        views = []
+        for entry in entries:
+            try:
+                view = viewOr422(entry.get("username"), entry.get("name"))
+                graph = db.session.get(Graph, view.view_hash)
+                if graph == None:
+                    app.aborter(422)
+                ensureGraph(graph)
+                graph_store.infer(graph.hash_id)
+                views.append((entry, view, None))
+            except HTTPException as e:
+                views.append((entry, None, e.code))
+
+        # Views running the same pipeline over the same graph are only evaluated once
+        evaluations = {}
+        for entry, view, status in views:
+            if view != None:
+                etag = pipeline_key(view.view_hash, view.transforms, graph_store.ontology_version)
+                if etag not in evaluations:
+                    evaluations[etag] = evaluator.submit(view.view_hash, view.transforms)
+
+        results = []
+        for entry, view, status in views:
+            result = {"username": entry.get("username"), "name": entry.get("name")}
+            if view == None:
+                results.append({**result, "status": status})
+                continue
+
+            etag = pipeline_key(view.view_hash, view.transforms, graph_store.ontology_version)
+            try:
+                evaluation = evaluations[etag].result()
+            except Exception:
+                results.append({**result, "status": 500})
+                continue
+
+            results.append({
+                **result,
+                "status": 200,
+                "etag": etag,
+                "triples": evaluation.triples,
+                "graph": {"type": "n-quads", "content": evaluation.nquads.decode("utf-8")}
+            })
+
+        return app.json.response(views = results)
+
+    # Runs edited transforms over a view's graph without saving them. Outputs of the stages before the first
+    # edited one are still cached from earlier runs, so only the edited stage and those after it are run
+    @app.route("/view/<username>/<display_name>/preview.json", methods=["POST"])
+    def post_preview_json(username: str, display_name: str) -> Response:
+        if request.headers.get("Content-Type") != "application/json":
+            app.aborter(400) # Content is not JSON
+
+        transforms = request.json.get("transforms") if isinstance(request.json, dict) else None
+        if not isTransformList(transforms):
+            app.aborter(400)
+
+        view = viewOr422(username, display_name)
+        pipeline_run = runPipeline(view.view_hash, transforms)
+
+        # Transforms are marked in the order they're run, the first `reused` of them were read from the cache
+        plan = explain(pipeline_run.plan)
+        kept = [
+            description for stage in plan["stages"]
+                for description in ([stage["sparql"]] if stage["sparql"] != None else []) + stage["filters"]
+        ]
+        for position, description in enumerate(kept):
+            description["reused"] = position < pipeline_run.reused
+
+        return app.json.response(
+            **plan,
+            reused = pipeline_run.reused,
+            computed = len(kept) - pipeline_run.reused,
+            etag = pipeline_key(view.view_hash, transforms, graph_store.ontology_version),
+            triples = len(pipeline_run.store),
+            graph = {"type": "n-quads", "content": dump_nquads(pipeline_run.store).decode("utf-8")}
+        )
+
+    # Shows how `filtered.nq` runs the view's transforms, without running them
+    @app.route("/view/<username>/<display_name>/plan.json", methods=["GET"])
+    def get_plan_json(username: str, display_name: str) -> Response:
+        view = viewOr422(username, display_name)
+
+        # Names are part of the plan, so unlike `pipeline_key()` the etag covers them
+        etag = sha256(json.dumps(
+            view.transforms,
+            sort_keys = True,
+            separators = (',', ':')
+        ).encode("utf-8")).hexdigest()[:32]
+
+        cached = notModified(etag)
+        if cached != None:
+            return cached
+
+        return withValidators(app.json.response(**explain(plan_pipeline(view.transforms))), etag)
+
+    def diffResponse(changes: Callable[[], Iterator[Quad]], base_etag: str, immutable: bool = False) -> Response:
+        # Only one side fits in N-Triples, so it must be picked with `?side=`
+        side = request.args.get("side")
+        if side != None and side not in SIDES:
+            app.aborter(400)
+
+        mime_type = request.accept_mimetypes.best_match(list(DIFF_TYPES.values()), default = DIFF_TYPES["json"])
+        diff_type = next(diff_type for diff_type, diff_mime_type in DIFF_TYPES.items() if diff_mime_type == mime_type)
+        if diff_type == "n-triples" and side == None:
+            app.aborter(400)
+
+        etag = f"{base_etag}-{diff_type}" if side == None else f"{base_etag}-{diff_type}-{side}"
+        cached = notModified(etag, immutable)
+        if cached != None:
+            cached.headers["Vary"] = "Accept"
+            return cached
+
+        # Changes are found while the response is streamed, so the diff is never held in memory
+        response = Response(serialize_diff(changes(), diff_type, side), mimetype = mime_type)
+        response.headers["Vary"] = "Accept"
+        return withValidators(response, etag, immutable)
+
+    # Triples removed and added going from one stored graph to another
+    @app.route("/graph/<int:hash_id>/diff/<int:other_hash_id>", methods=["GET"])
+    def get_graph_diff(hash_id: int, other_hash_id: int) -> Response:
+        graph = db.session.get(Graph, hash_id)
+        other_graph = db.session.get(Graph, other_hash_id)
+
+        if graph == None or other_graph == None:
             app.aborter(422)
 
+        return diffResponse(
+            lambda: graph_changes(graph_store.store, ensureGraph(graph), graph_store.store, ensureGraph(other_graph)),
+            f"{hash_id}-diff-{other_hash_id}",
+            immutable = True
+        )
+
+    # Triples removed and added going from one view's filtered graph to another's
+    @app.route("/view/<username>/<display_name>/diff/<other_username>/<other_display_name>", methods=["GET"])
+    def get_view_diff(username: str, display_name: str, other_username: str, other_display_name: str) -> Response:
+        view = viewOr422(username, display_name)
+        other_view = viewOr422(other_username, other_display_name)
+
+        etag = sha256(json.dumps(
+            [pipeline_key(view.view_hash, view.transforms, graph_store.ontology_version), pipeline_key(other_view.view_hash, other_view.transforms, graph_store.ontology_version)],
+            separators = (',', ':')
+        ).encode("utf-8")).hexdigest()[:32]
+
+        # Views can be re-saved, so unlike graph diffs this must be revalidated
+        return diffResponse(
+            lambda: graph_changes(filteredStore(view), DefaultGraph(), filteredStore(other_view), DefaultGraph()),
+            etag
+        )
+
+    @app.route("/view/<username>/<display_name>", methods=["GET"])
+    def get_main_page(username: str, display_name: str) -> Response:
+        viewOr422(username, display_name)
         return render_template("index.html")
 
     @app.route("/", methods=["GET"])
@@ -249,18 +1162,19 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
     def presence():
         return make_response('', 204)
 
-    def isBru(potential_bru) -> bool:
-        match potential_bru:
-            case {
-                "format": "bru",
-                "graph": {
-                    "type": "turtle",
-                    "content": dict(),
-                    **rest_graph
-                },
-                "transforms": [*transforms],
-                **rest
-            } if not rest and not rest_graph:
+    @app.route("/bruplint/cache.json", methods=["GET"])
+    def get_cache_json() -> Response:
+        return app.json.response(
+            transforms = transform_cache.stats(),
+            sparql = query_cache.stats(),
+            versions = version_cache.stats(),
+            views = view_cache.stats(),
+            terms = term_tables.stats()
+        )
+
+    def isTransformList(potential_transforms) -> bool:
+        match potential_transforms:
+            case [*transforms]:
                 for transform in transforms:
                     match transform:
                         case {
@@ -277,31 +1191,35 @@ def create(config: Optional[Mapping[str, Any]] = None) -> Flask:
             case _:
                 return False
 
+    def isBru(potential_bru) -> bool:
+        match potential_bru:
+            case {
+                "format": "bru",
+                "graph": {
+                    "type": str(graph_type),
+                    "content": dict(),
+                    **rest_graph
+                },
+                "transforms": [*transforms],
+                **rest
+            } if not rest and not rest_graph and graph_type in GRAPH_TYPES:
+                return isTransformList(transforms)
+            case _:
+                return False
+
     def isBrl(potential_brl) -> bool:
         match potential_brl:
             case {
                 "format": "brl",
                 "graph": {
-                    "type": "turtle",
+                    "type": str(graph_type),
                     "url": str(),
                     **rest_graph
                 },
                 "transforms": [*transforms],
                 **rest
-            } if not rest and not rest_graph:
-                for transform in transforms:
-                    match transform:
-                        case {
-                            "type": str(),
-                            "name": str(),
-                            "enabled": bool(),
-                            "params": dict(),
-                            **rest
-                        } if not rest:
-                            pass
-                        case _:
-                            return False
-                return True
+            } if not rest and not rest_graph and graph_type in GRAPH_TYPES:
+                return isTransformList(transforms)
             case _:
                 return False
 
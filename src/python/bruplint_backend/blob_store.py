@@ -0,0 +1,93 @@
+from hashlib import sha256
+from os import makedirs, path, remove, replace
+from tempfile import NamedTemporaryFile
+from typing import Iterable, Iterator, Tuple
+import mmap
+
+CHUNK_SIZE = 64 * 1024
+
+class BlobStore:
+    def __init__(self, root: str):
+        """
+        Opens (or creates) a directory of immutable blobs, each named by the SHA-256 of
+        its bytes and sharded by the first bytes of that digest, so no directory grows
+        too large to list
+
+        :param root: directory holding the blobs
+        :type root: str
+        """
+        self.root = root
+        makedirs(root, exist_ok=True)
+
+    def blob_path(self, key: str) -> str:
+        return path.join(self.root, key[:2], key[2:4], key)
+
+    def contains(self, key: str) -> bool:
+        return path.exists(self.blob_path(key))
+
+    def size(self, key: str) -> int:
+        return path.getsize(self.blob_path(key))
+
+    def put(self, content: bytes) -> str:
+        return self.put_chunks([content])[0]
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """
+        Writes a blob as it streams in. Blobs are written to a temporary file and renamed
+        into place, so a partially-written blob is never visible under its key
+
+        :param chunks: content of the blob, in chunks
+        :type chunks: iter(bytes)
+        :return: key and size of the blob
+        :rtype: tuple
+        """
+        digest = sha256()
+        size = 0
+        with NamedTemporaryFile(dir=self.root, delete=False) as blob:
+            try:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    blob.write(chunk)
+            except BaseException:
+                blob.close()
+                remove(blob.name)
+                raise
+
+        key = digest.hexdigest()
+        if self.contains(key):
+            # Identical content is only stored once
+            remove(blob.name)
+            return key, size
+
+        makedirs(path.dirname(self.blob_path(key)), exist_ok=True)
+        replace(blob.name, self.blob_path(key))
+        return key, size
+
+    def read(self, key: str) -> bytes:
+        with open(self.blob_path(key), "rb") as blob:
+            return blob.read()
+
+    def iter_range(self, key: str, start: int, stop: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Reads `blob[start:stop]` in chunks through a memory map, so only the pages read
+        are loaded and they're shared with every other reader through the page cache
+
+        :param key: key of the blob
+        :type key: str
+        :param start: first byte to read
+        :type start: int
+        :param stop: byte to stop reading at (exclusive)
+        :type stop: int
+        :param chunk_size: maximum size of each yielded chunk
+        :type chunk_size: int
+        :return: iterator of chunks
+        :rtype: iter(bytes)
+        """
+        if start >= stop:
+            return
+
+        with open(self.blob_path(key), "rb") as blob:
+            with mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for position in range(start, min(stop, len(mapped)), chunk_size):
+                    yield mapped[position:min(position + chunk_size, stop)]
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Optional, Sequence, Tuple
+
+class LruByteCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * (2 ** 20)):
+        """
+        Creates a thread-safe least-recently-used cache of byte strings, bounded both by
+        entry count and by the total size of the cached values
+
+        :param max_entries: maximum number of cached values
+        :type max_entries: int
+        :param max_bytes: maximum total size of cached values, in bytes
+        :type max_bytes: int
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Incremented by every removal, see `put()`
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return value
+
+    def longest(self, keys: Sequence[Hashable]) -> Tuple[int, Optional[bytes]]:
+        """
+        Looks up the last cached key of `keys`, counting a single hit or miss
+
+        :param keys: keys ordered from shortest to longest prefix
+        :type keys: list
+        :return: number of keys covered by the cached value (0 if nothing is cached) and the value
+        :rtype: tuple
+        """
+        with self.lock:
+            for index in range(len(keys) - 1, -1, -1):
+                value = self.entries.get(keys[index])
+                if value is not None:
+                    self.hits += 1
+                    self.entries.move_to_end(keys[index])
+                    return index + 1, value
+            self.misses += 1
+            return 0, None
+
+    def put(self, key: Hashable, value: bytes, generation: Optional[int] = None) -> None:
+        """
+        Caches a value, evicting the least recently used values if needed
+
+        :param key: key of the value
+        :type key: Hashable
+        :param value: value to cache
+        :type value: bytes
+        :param generation: `generation` when the value was read from its source, so that a
+            value read before a concurrent `remove()` isn't cached after it
+        :type generation: int or None
+        """
+        # Values that could never fit would only flush everything else
+        if len(value) > self.max_bytes:
+            return
+
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+            self.entries[key] = value
+            self.size += len(value)
+
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def remove(self, key: Hashable) -> None:
+        with self.lock:
+            self.generation += 1
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,99 @@
+from typing import Iterable, Iterator
+import zlib
+
+# zstd is optional, graphs are compressed with gzip when it isn't installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Values match HTTP content-coding tokens, so stored bytes can be served with `Content-Encoding` as-is
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+def default_encoding() -> str:
+    return GZIP if zstandard is None else ZSTD
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return b"".join(iter_compress([content], encoding))
+
+def iter_compress(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Encodes content for storage chunk by chunk
+
+    :param chunks: uncompressed content
+    :type chunks: iter(bytes)
+    :param encoding: `IDENTITY`, `GZIP`, or `ZSTD` if zstandard is installed
+    :type encoding: str
+    :return: iterator of encoded chunks
+    :rtype: iter(bytes)
+    :raises ValueError: if the encoding is unavailable
+    """
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+    elif encoding == GZIP:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif encoding == ZSTD and zstandard is not None:
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f"Unavailable encoding: {encoding}")
+
+    for chunk in chunks:
+        output = compressor.compress(chunk)
+        if output:
+            yield output
+    output = compressor.flush()
+    if output:
+        yield output
+
+def decompress(content: bytes, encoding: str) -> bytes:
+    return b"".join(iter_decompress([content], encoding))
+
+def iter_decompress(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Decodes stored content chunk by chunk
+
+    :param chunks: encoded content
+    :type chunks: iter(bytes)
+    :param encoding: encoding the content was stored with
+    :type encoding: str
+    :return: iterator of decoded chunks
+    :rtype: iter(bytes)
+    :raises ValueError: if the encoding is unavailable
+    """
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+    elif encoding == GZIP:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            output = decompressor.decompress(chunk)
+            if output:
+                yield output
+        output = decompressor.flush()
+        if output:
+            yield output
+        return
+    elif encoding == ZSTD and zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        for chunk in chunks:
+            output = decompressor.decompress(chunk)
+            if output:
+                yield output
+        return
+    raise ValueError(f"Unavailable encoding: {encoding}")
+
+def slice_chunks(chunks: Iterable[bytes], start: int, stop: int) -> Iterator[bytes]:
+    # Decoded content can't be seeked, so ranges over it skip to `start` as it streams
+    position = 0
+    for chunk in chunks:
+        chunk_start = max(start - position, 0)
+        chunk_stop = min(stop - position, len(chunk))
+        position += len(chunk)
+
+        if chunk_start < chunk_stop:
+            yield chunk[chunk_start:chunk_stop]
+        if position >= stop:
+            return
@@ -0,0 +1,47 @@
+from hashlib import sha256
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterable, Tuple
+
+# `Graph.hash_id` is a signed 64-bit column, so keeps 63 bits of the digest
+HASH_ID_MASK = (2 ** 63) - 1
+
+# Bodies larger than this are spooled to disk while they're hashed
+SPOOL_MEMORY = 8 * (2 ** 20)
+
+def hash_id_for(digest: str) -> int:
+    """
+    Derives the short identifier used in URLs from a content digest. Identifiers are
+    only a starting point: uniqueness is guaranteed by the digest, and a colliding
+    identifier is probed past when the graph is stored
+
+    :param digest: hex SHA-256 digest of the content
+    :type digest: str
+    :return: identifier for `Graph.hash_id`
+    :rtype: int
+    """
+    return int(digest[:16], 16) & HASH_ID_MASK
+
+def digest_chunks(chunks: Iterable[bytes]) -> str:
+    digest = sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def spool(chunks: Iterable[bytes]) -> Tuple[str, int, IO[bytes]]:
+    """
+    Hashes content as it streams in, keeping it in memory only while it's small
+
+    :param chunks: content, in chunks
+    :type chunks: iter(bytes)
+    :return: hex SHA-256 digest, size, and a file holding the content (positioned at its start)
+    :rtype: tuple
+    """
+    digest = sha256()
+    size = 0
+    spooled = SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+        spooled.write(chunk)
+    spooled.seek(0)
+    return digest.hexdigest(), size, spooled
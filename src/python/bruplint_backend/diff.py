@@ -0,0 +1,89 @@
+from pyoxigraph import Quad, Triple
+from typing import Iterable, Iterator, Optional
+from versions import ADDED_GRAPH, REMOVED_GRAPH, unskolemize
+import json
+
+# Sides of a diff, and the graphs their triples are in (see `versions.graph_changes()`)
+SIDES = {
+    "added": ADDED_GRAPH,
+    "removed": REMOVED_GRAPH
+}
+
+DIFF_TYPES = {
+    "json": "application/json",
+    "n-triples": "application/n-triples",
+    "n-quads": "application/n-quads"
+}
+
+# Lines are yielded in batches, so responses stream without a write per triple
+BATCH_SIZE = 4096
+
+def as_triple(quad: Quad) -> Triple:
+    # Blank nodes keep their labels, so they match across both sides of the diff
+    triple = unskolemize(quad)
+    return Triple(triple.subject, triple.predicate, triple.object)
+
+def batched(lines: Iterable[str]) -> Iterator[bytes]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == BATCH_SIZE:
+            yield "".join(batch).encode("utf-8")
+            batch = []
+    if batch:
+        yield "".join(batch).encode("utf-8")
+
+def diff_ntriples(changes: Iterable[Quad]) -> Iterator[bytes]:
+    return batched(f"{as_triple(quad)} .\n" for quad in changes)
+
+def diff_nquads(changes: Iterable[Quad]) -> Iterator[bytes]:
+    def lines() -> Iterator[str]:
+        for quad in changes:
+            triple = as_triple(quad)
+            yield f"{Quad(triple.subject, triple.predicate, triple.object, quad.graph_name)} .\n"
+    return batched(lines())
+
+def diff_json(changes: Iterable[Quad]) -> Iterator[bytes]:
+    # Removed triples all come before added ones, so each side is written as a single array
+    def lines() -> Iterator[str]:
+        counts = {"removed": 0, "added": 0}
+        current: Optional[str] = None
+        yield "{"
+        for quad in changes:
+            side = "added" if quad.graph_name == ADDED_GRAPH else "removed"
+            if side != current:
+                yield f'{"" if current == None else "],"}"{side}":['
+                current = side
+            yield f'{"," if counts[side] else ""}{json.dumps(str(as_triple(quad)))}'
+            counts[side] += 1
+        if current != None:
+            yield "],"
+        for side in ("removed", "added"):
+            if counts[side] == 0:
+                yield f'"{side}":[],'
+        yield f'"counts":{json.dumps(counts, separators=(",", ":"))}}}'
+    return batched(lines())
+
+def serialize_diff(changes: Iterable[Quad], diff_type: str, side: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Serializes the changes between two graphs as they're found, so that diffs of
+    large graphs are streamed rather than built up in memory
+
+    :param changes: changes found by `versions.graph_changes()`
+    :type changes: iter(Quad)
+    :param diff_type: one of `DIFF_TYPES`
+    :type diff_type: str
+    :param side: one of `SIDES` to only include that side, required for N-Triples which can't tell them apart
+    :type side: str or None
+    :return: chunks of the serialized diff
+    :rtype: iter(bytes)
+    """
+    if side != None:
+        graph_name = SIDES[side]
+        changes = (quad for quad in changes if quad.graph_name == graph_name)
+
+    if diff_type == "n-triples":
+        return diff_ntriples(changes)
+    elif diff_type == "n-quads":
+        return diff_nquads(changes)
+    return diff_json(changes)
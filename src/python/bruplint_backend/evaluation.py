@@ -0,0 +1,152 @@
+from cache import LruByteCache
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from graph_store import GraphStore
+from multiprocessing import get_context
+from os import makedirs, path
+from pipeline import Inference, dump_nquads, run_pipeline, uses_inference
+from pyoxigraph import NamedNode, Store
+from shutil import rmtree
+from tempfile import mkdtemp
+from terms import TermTableCache
+from threading import Lock, Thread
+from typing import Any, List, Mapping, NamedTuple, Optional, Set
+import atexit
+
+# State of a worker process, set up by `init_worker()`
+worker_store: Optional[Store] = None
+worker_cache: Optional[LruByteCache] = None
+worker_term_tables: Optional[TermTableCache] = None
+
+class Evaluation(NamedTuple):
+    nquads: bytes
+    triples: int
+
+def init_worker(checkpoints: Any, cache_max_entries: int, cache_max_bytes: int, term_table_max_entries: int) -> None:
+    global worker_store, worker_cache, worker_term_tables
+
+    # A RocksDB directory can only be opened by one process, so each worker takes its own checkpoint
+    worker_store = Store(checkpoints.get())
+    worker_cache = LruByteCache(cache_max_entries, cache_max_bytes)
+    worker_term_tables = TermTableCache(term_table_max_entries)
+
+def evaluate(hash_id: int, transforms: List[Mapping[str, Any]]) -> Evaluation:
+    # Run in a worker process, which can only be sent picklable arguments, so graph names are derived here
+    store = run_pipeline(
+        hash_id,
+        transforms,
+        worker_store,
+        worker_cache,
+        GraphStore.graph_name(hash_id),
+        Inference(worker_store, GraphStore.inferred_graph_name(hash_id)),
+        worker_term_tables
+    )
+    # Placeholders of partially matched quads are in their own graph, and are kept and counted too
+    return Evaluation(dump_nquads(store), len(store))
+
+def retire(executor: ProcessPoolExecutor, snapshot: str) -> None:
+    # Work already submitted still finishes, after which the checkpoints it read can go
+    def shutdown() -> None:
+        executor.shutdown(wait=True)
+        rmtree(snapshot, ignore_errors=True)
+    Thread(target=shutdown, name="retire-evaluator", daemon=True).start()
+
+class ViewEvaluator:
+    def __init__(self, graph_store: GraphStore, snapshot_path: str, workers: int = 4, cache_max_entries: int = 64, cache_max_bytes: int = 64 * (2 ** 20), term_table_max_entries: int = 8):
+        """
+        Evaluates views on a pool of processes, so that batches of them use every core.
+        Workers read graphs from checkpoints of the graph store rather than parsing them
+        again. Stored graphs never change, so the pool is only replaced with fresh
+        checkpoints when a view's graph (or the types inferred for it) isn't in them
+
+        :param graph_store: store holding the graphs of the views
+        :type graph_store: GraphStore
+        :param snapshot_path: directory the checkpoints are written to, on the same filesystem as the graph store
+        :type snapshot_path: str
+        :param workers: number of worker processes
+        :type workers: int
+        :param cache_max_entries: maximum number of stage outputs cached by each worker
+        :type cache_max_entries: int
+        :param cache_max_bytes: maximum total size of the stage outputs cached by each worker
+        :type cache_max_bytes: int
+        :param term_table_max_entries: maximum number of term tables kept by each worker
+        :type term_table_max_entries: int
+        """
+        self.graph_store = graph_store
+        self.workers = workers
+        self.initargs = (cache_max_entries, cache_max_bytes, term_table_max_entries)
+
+        makedirs(snapshot_path, exist_ok=True)
+        self.snapshot_path = mkdtemp(dir=snapshot_path)
+        self.generation = 0
+
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.snapshot: Optional[str] = None
+        # Graphs that were stored when the checkpoints were taken
+        self.graphs: Set[NamedNode] = set()
+        self.lock = Lock()
+
+        # Checkpoints are only removed once their workers have exited
+        atexit.register(self.shutdown)
+
+    def refresh(self, required: List[NamedNode]) -> ProcessPoolExecutor:
+        # Called with `lock` held
+        if self.executor is not None and self.graphs.issuperset(required):
+            return self.executor
+
+        if self.executor is not None:
+            retire(self.executor, self.snapshot)
+
+        # Read before checkpointing, so graphs stored meanwhile cause another refresh
+        graphs = self.graph_store.stored()
+        self.generation += 1
+        snapshot = path.join(self.snapshot_path, str(self.generation))
+        makedirs(snapshot)
+
+        # Worker processes are spawned, as forking would copy the threads and open store of this one
+        context = get_context("spawn")
+        checkpoints = context.Queue()
+        for worker in range(self.workers):
+            checkpoint = path.join(snapshot, str(worker))
+            self.graph_store.checkpoint(checkpoint)
+            checkpoints.put(checkpoint)
+
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context = context,
+            initializer = init_worker,
+            initargs = (checkpoints, *self.initargs)
+        )
+        self.snapshot, self.graphs = snapshot, graphs
+        return self.executor
+
+    def submit(self, hash_id: int, transforms: List[Mapping[str, Any]]) -> Future:
+        """
+        Queues the evaluation of a view. Its graph, and the types inferred for it, must
+        already be in the graph store
+
+        :param hash_id: hash of the view's graph
+        :type hash_id: int
+        :param transforms: transforms as saved in `View.transforms`
+        :type transforms: list
+        :return: future of the filtered graph
+        :rtype: Future
+        """
+        required = [GraphStore.graph_name(hash_id)]
+        if uses_inference(transforms):
+            required.append(GraphStore.inferred_graph_name(hash_id))
+
+        with self.lock:
+            try:
+                return self.refresh(required).submit(evaluate, hash_id, list(transforms))
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for using too much memory), so the pool is replaced
+                self.graphs = set()
+                return self.refresh(required).submit(evaluate, hash_id, list(transforms))
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            rmtree(self.snapshot_path, ignore_errors=True)
@@ -0,0 +1,219 @@
+from concurrent.futures import Future
+from hashlib import sha256
+from os import dup, listdir, makedirs, path, remove, replace, utime
+from tempfile import NamedTemporaryFile
+from threading import Lock, Timer
+from typing import Dict, NamedTuple, Optional
+import json
+import socket
+import time
+import urllib3
+
+class FetchError(Exception):
+    pass
+
+class Fetched(NamedTuple):
+    # Hex SHA-256 of the body
+    digest: str
+    size: int
+    # Cached copy of the body, named by its digest so it never changes under a reader
+    path: str
+
+class Fetcher:
+    def __init__(
+        self,
+        cache_path: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        total_timeout: float = 120.0,
+        max_size: int = 2 ** 30,
+        pool_size: int = 10,
+        max_cached: int = 256
+    ):
+        """
+        Fetches remote graphs through pooled connections, with every fetch bounded in
+        time and size. Concurrent fetches of the same URL share a single request, and
+        bodies are cached on disk and revalidated with `ETag`/`Last-Modified`
+
+        :param cache_path: directory holding fetched bodies
+        :type cache_path: str
+        :param connect_timeout: seconds allowed to connect
+        :type connect_timeout: float
+        :param read_timeout: seconds allowed between two reads
+        :type read_timeout: float
+        :param total_timeout: seconds allowed for the whole fetch, however slowly the body trickles in
+        :type total_timeout: float
+        :param max_size: largest body accepted, in bytes
+        :type max_size: int
+        :param pool_size: connections kept open per host
+        :type pool_size: int
+        :param max_cached: number of bodies kept on disk
+        :type max_cached: int
+        """
+        self.cache_path = cache_path
+        self.total_timeout = total_timeout
+        self.max_size = max_size
+        self.max_cached = max_cached
+
+        self.pool = urllib3.PoolManager(
+            maxsize = pool_size,
+            block = False,
+            timeout = urllib3.Timeout(connect=connect_timeout, read=read_timeout)
+        )
+        # Passed with each request, as redirects are followed by the pool manager, which ignores the pools' retries.
+        # `total` would also cap redirects, so failures are limited by kind instead
+        self.retries = urllib3.Retry(total=None, connect=2, read=2, other=2, redirect=5, raise_on_redirect=True)
+
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = Lock()
+
+        makedirs(cache_path, exist_ok=True)
+
+    def fetch(self, url: str) -> Fetched:
+        """
+        Fetches a URL, or waits for an identical fetch that is already running
+
+        :param url: absolute HTTP(S) URL
+        :type url: str
+        :return: digest, size and location of the body
+        :rtype: Fetched
+        :raises FetchError: if the URL can't be fetched within the limits
+        """
+        with self.lock:
+            pending = self.in_flight.get(url)
+            leader = pending is None
+            if leader:
+                pending = Future()
+                self.in_flight[url] = pending
+
+        if not leader:
+            return pending.result()
+
+        try:
+            fetched = self.fetch_uncoalesced(url)
+            pending.set_result(fetched)
+            return fetched
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[url]
+
+    def metadata_path(self, url: str) -> str:
+        return path.join(self.cache_path, f"{sha256(url.encode('utf-8')).hexdigest()}.json")
+
+    def body_path(self, digest: str) -> str:
+        return path.join(self.cache_path, f"{digest}.body")
+
+    def read_metadata(self, url: str) -> Optional[dict]:
+        try:
+            with open(self.metadata_path(url)) as metadata_file:
+                metadata = json.load(metadata_file)
+        except (OSError, ValueError):
+            return None
+
+        # The body may have been evicted since
+        if not path.exists(self.body_path(metadata["digest"])):
+            return None
+        return metadata
+
+    def fetch_uncoalesced(self, url: str) -> Fetched:
+        if not url.startswith(("http://", "https://")):
+            raise FetchError(f"Unsupported URL: {url}")
+
+        cached = self.read_metadata(url)
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        deadline = time.monotonic() + self.total_timeout
+
+        try:
+            response = self.pool.request("GET", url, headers=headers, retries=self.retries, preload_content=False)
+        except urllib3.exceptions.HTTPError as e:
+            raise FetchError(f"Failed to fetch {url}: {e}") from e
+
+        try:
+            if response.status == 304 and cached is not None:
+                fetched = Fetched(cached["digest"], cached["size"], self.body_path(cached["digest"]))
+                utime(fetched.path)
+                return fetched
+            if response.status != 200:
+                raise FetchError(f"Failed to fetch {url}: status {response.status}")
+
+            length = response.headers.get("Content-Length")
+            if length is not None and length.isdigit() and int(length) > self.max_size:
+                raise FetchError(f"Failed to fetch {url}: body exceeds {self.max_size} bytes")
+
+            # Reads block until a whole chunk arrives, so a body trickling in is cut off by closing the socket
+            watchdog = Timer(max(deadline - time.monotonic(), 0), self.abort, (response,))
+            watchdog.start()
+
+            digest = sha256()
+            size = 0
+            with NamedTemporaryFile(dir=self.cache_path, delete=False) as body:
+                try:
+                    try:
+                        for chunk in response.stream(64 * 1024):
+                            size += len(chunk)
+                            if size > self.max_size:
+                                raise FetchError(f"Failed to fetch {url}: body exceeds {self.max_size} bytes")
+                            digest.update(chunk)
+                            body.write(chunk)
+                    except urllib3.exceptions.HTTPError as e:
+                        if time.monotonic() <= deadline:
+                            raise FetchError(f"Failed to fetch {url}: {e}") from e
+                    finally:
+                        watchdog.cancel()
+
+                    if time.monotonic() > deadline:
+                        raise FetchError(f"Failed to fetch {url}: took longer than {self.total_timeout}s")
+                    # `Content-Length` counts the bytes sent, before any `Content-Encoding` is decoded
+                    if length is not None and length.isdigit() and int(length) != response.tell():
+                        raise FetchError(f"Failed to fetch {url}: body ended after {response.tell()} bytes")
+                except FetchError:
+                    remove(body.name)
+                    raise
+        finally:
+            response.release_conn()
+
+        fetched = Fetched(digest.hexdigest(), size, self.body_path(digest.hexdigest()))
+
+        replace(body.name, fetched.path)
+        with open(self.metadata_path(url), "w") as metadata_file:
+            json.dump({
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "digest": fetched.digest,
+                "size": fetched.size
+            }, metadata_file)
+
+        self.evict()
+        return fetched
+
+    def abort(self, response: urllib3.HTTPResponse) -> None:
+        # Shutting down a duplicate of the descriptor also wakes the read blocked on the original
+        try:
+            with socket.socket(fileno=dup(response.fileno())) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        # Least recently fetched bodies are removed first, their metadata is dropped when next read
+        bodies = [path.join(self.cache_path, name) for name in listdir(self.cache_path) if name.endswith(".body")]
+        if len(bodies) <= self.max_cached:
+            return
+
+        bodies.sort(key=lambda body: path.getmtime(body))
+        for body in bodies[:len(bodies) - self.max_cached]:
+            try:
+                remove(body)
+            except OSError:
+                pass
@@ -0,0 +1,72 @@
+from io import BytesIO
+from pyoxigraph import DefaultGraph, Quad, Triple, parse, serialize
+from typing import Iterable, Optional
+
+# Values of `graph.type` in Brus and Brls, and their MIME types
+GRAPH_TYPES = {
+    "turtle": "text/turtle",
+    "n-triples": "application/n-triples",
+    "n-quads": "application/n-quads"
+}
+
+EXTENSIONS = {
+    "turtle": "ttl",
+    "n-triples": "nt",
+    "n-quads": "nq"
+}
+
+def type_for_extension(extension: str) -> Optional[str]:
+    for graph_type, graph_extension in EXTENSIONS.items():
+        if graph_extension == extension:
+            return graph_type
+    return None
+
+def type_for_mime_type(mime_type: str) -> Optional[str]:
+    for graph_type, graph_mime_type in GRAPH_TYPES.items():
+        if graph_mime_type == mime_type:
+            return graph_type
+    return None
+
+def as_turtle(content: bytes, graph_type: str) -> bytes:
+    """
+    Converts an uploaded graph into content that can be stored as Turtle. N-Triples is
+    a subset of Turtle so is kept as-is, while N-Quads is re-serialized as N-Triples
+
+    :param content: uploaded graph
+    :type content: bytes
+    :param graph_type: one of `GRAPH_TYPES`
+    :type graph_type: str
+    :return: Turtle-compatible content
+    :rtype: bytes
+    :raises SyntaxError: if N-Quads content is invalid or uses named graphs
+    """
+    if graph_type != "n-quads":
+        return content
+
+    triples = []
+    for quad in parse(BytesIO(content), GRAPH_TYPES["n-quads"]):
+        if quad.graph_name != DefaultGraph():
+            raise SyntaxError("Graphs cannot contain named graphs")
+        triples.append(Triple(quad.subject, quad.predicate, quad.object))
+
+    output = BytesIO()
+    serialize(triples, output, GRAPH_TYPES["n-triples"])
+    return output.getvalue()
+
+def serialize_quads(quads: Iterable[Quad], graph_type: str) -> bytes:
+    """
+    Serializes default-graph quads in the given format
+
+    :param quads: quads to serialize
+    :type quads: iter(Quad)
+    :param graph_type: one of `GRAPH_TYPES`
+    :type graph_type: str
+    :return: serialized graph
+    :rtype: bytes
+    """
+    output = BytesIO()
+    if graph_type == "n-quads":
+        serialize(quads, output, GRAPH_TYPES[graph_type])
+    else:
+        serialize((Triple(quad.subject, quad.predicate, quad.object) for quad in quads), output, GRAPH_TYPES[graph_type])
+    return output.getvalue()
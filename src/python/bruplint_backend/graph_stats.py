@@ -0,0 +1,173 @@
+from hashlib import blake2b
+from pyoxigraph import NamedNode, Quad, Store
+from typing import Dict, Iterable
+import math
+
+BRICK = "https://brickschema.org/schema/Brick#"
+
+# Relationships whose degree distributions are summarized
+DEGREE_PREDICATES = {
+    "hasPoint": f"{BRICK}hasPoint",
+    "feeds": f"{BRICK}feeds"
+}
+
+# 2^14 registers estimate distinct counts to within ~1%, in 16KiB whatever the graph's size
+HLL_PRECISION = 14
+
+# Usage is only tracked for this many predicates and namespaces, the rest are counted together
+MAX_TRACKED = 1024
+
+def namespace(iri: str) -> str:
+    """
+    Splits the namespace off an IRI, at its last `#`, `/` or `:`
+
+    :param iri: IRI to split
+    :type iri: str
+    :return: namespace of the IRI, including the separator
+    :rtype: str
+    """
+    for separator in ("#", "/", ":"):
+        index = iri.rfind(separator)
+        if index != -1:
+            return iri[:index + 1]
+    return iri
+
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION):
+        """
+        Estimates the number of distinct values added, in constant memory
+
+        :param precision: number of bits of each hash used to pick a register
+        :type precision: int
+        """
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        hashed = int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+        register = hashed & ((1 << self.precision) - 1)
+        remaining = hashed >> self.precision
+        # Position of the lowest set bit of the remaining hash
+        rank = (remaining & -remaining).bit_length() if remaining else 64 - self.precision + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+
+        # Small cardinalities are estimated more accurately from the number of empty registers
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * size and empty > 0:
+            estimate = size * math.log(size / empty)
+        return round(estimate)
+
+class GraphStats:
+    def __init__(self):
+        """
+        Statistics of a graph, collected one triple at a time so that memory use doesn't
+        grow with the graph
+        """
+        self.triples = 0
+        self.subjects = HyperLogLog()
+        self.predicates = HyperLogLog()
+        self.predicate_usage: Dict[str, int] = {}
+        self.namespace_usage: Dict[str, int] = {}
+        # Triples using predicates, and IRIs in namespaces, beyond `MAX_TRACKED`
+        self.other_predicates = 0
+        self.other_namespaces = 0
+
+    def add(self, quad: Quad) -> None:
+        self.triples += 1
+        self.subjects.add(str(quad.subject))
+        self.predicates.add(quad.predicate.value)
+
+        predicate = quad.predicate.value
+        if predicate in self.predicate_usage or len(self.predicate_usage) < MAX_TRACKED:
+            self.predicate_usage[predicate] = self.predicate_usage.get(predicate, 0) + 1
+        else:
+            self.other_predicates += 1
+
+        for term in (quad.subject, quad.predicate, quad.object):
+            if not isinstance(term, NamedNode):
+                continue
+            term_namespace = namespace(term.value)
+            if term_namespace in self.namespace_usage or len(self.namespace_usage) < MAX_TRACKED:
+                self.namespace_usage[term_namespace] = self.namespace_usage.get(term_namespace, 0) + 1
+            else:
+                self.other_namespaces += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "triples": self.triples,
+            "subjects": self.subjects.count(),
+            "predicates": self.predicates.count(),
+            "predicate_usage": self.predicate_usage,
+            "namespace_usage": self.namespace_usage,
+            "other_predicates": self.other_predicates,
+            "other_namespaces": self.other_namespaces
+        }
+
+def graph_stats(quads: Iterable[Quad]) -> GraphStats:
+    """
+    Collects the statistics of a graph, consuming its quads as they're produced
+
+    :param quads: quads of the graph
+    :type quads: iter(Quad)
+    :return: statistics of the graph
+    :rtype: GraphStats
+    """
+    stats = GraphStats()
+    for quad in quads:
+        stats.add(quad)
+    return stats
+
+def grouped_counts(store: Store, query: str, graph_name: NamedNode) -> Dict[str, int]:
+    # `query` selects a `?key` and its `?count`
+    return {
+        solution["key"].value: int(solution["count"].value)
+        for solution in store.query(query, default_graph=graph_name)
+    }
+
+def degree_histogram(store: Store, pattern: str, graph_name: NamedNode) -> Dict[int, int]:
+    # `pattern` binds `?node` once per edge, so each group's size is that node's degree
+    histogram: Dict[int, int] = {}
+    for solution in store.query(f"SELECT (COUNT(*) AS ?degree) WHERE {{ {pattern} }} GROUP BY ?node", default_graph=graph_name):
+        degree = int(solution["degree"].value)
+        histogram[degree] = histogram.get(degree, 0) + 1
+    return dict(sorted(histogram.items()))
+
+def graph_summary(store: Store, graph_name: NamedNode) -> dict:
+    """
+    Summarizes the schema of a stored graph: how many instances each class has, how
+    often each predicate is used, and how many nodes have each number of
+    `brick:hasPoint`/`brick:feeds` relationships. Counting is done by the store, so
+    only the counts themselves are returned to Python
+
+    :param store: store holding the graph
+    :type store: Store
+    :param graph_name: named graph of the graph
+    :type graph_name: NamedNode
+    :return: class and predicate counts, and out/in-degree histograms by relationship
+    :rtype: dict
+    """
+    return {
+        "classes": grouped_counts(
+            store,
+            "SELECT ?key (COUNT(*) AS ?count) WHERE { ?instance a ?key } GROUP BY ?key",
+            graph_name
+        ),
+        "predicates": grouped_counts(
+            store,
+            "SELECT ?key (COUNT(*) AS ?count) WHERE { ?subject ?key ?object } GROUP BY ?key",
+            graph_name
+        ),
+        "degrees": {
+            name: {
+                "out": degree_histogram(store, f"?node <{predicate}> ?other", graph_name),
+                "in": degree_histogram(store, f"?other <{predicate}> ?node", graph_name)
+            }
+            for name, predicate in DEGREE_PREDICATES.items()
+        }
+    }
@@ -0,0 +1,205 @@
+from contextlib import contextmanager
+from formats import GRAPH_TYPES, type_for_extension
+from hashlib import sha256
+from io import BytesIO
+from pyoxigraph import Literal, NamedNode, Quad, Store
+from threading import Lock
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Set
+
+GRAPH_PREFIX = "urn:bruplint:graph:"
+
+# Marks graphs as fully loaded, so a partially-written graph is never served
+CATALOG_GRAPH = NamedNode("urn:bruplint:catalog")
+LOADED_PREDICATE = NamedNode("urn:bruplint:loaded")
+# Marks inferred graphs as complete, with the version of the ontology they were inferred with
+INFERRED_PREDICATE = NamedNode("urn:bruplint:inferred")
+
+# Class hierarchies (e.g. Brick's) used to infer types, in addition to each graph's own
+ONTOLOGY_GRAPH = NamedNode("urn:bruplint:ontology")
+
+RDF_TYPE = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
+RDFS_SUBCLASS_OF = NamedNode("http://www.w3.org/2000/01/rdf-schema#subClassOf")
+
+class GraphStore:
+    def __init__(self, path: str, ontology_paths: Iterable[str] = ()):
+        """
+        Opens (or creates) the on-disk store holding every uploaded graph, already parsed
+        and indexed, with one named graph per `Graph.hash_id`
+
+        :param path: directory of the RocksDB-backed store
+        :type path: str
+        :param ontology_paths: Turtle or N-Triples files whose class hierarchies are used when inferring types
+        :type ontology_paths: list
+        """
+        self.path = path
+        self.store = Store(path)
+        # Locks of the graphs being written, with the number of threads holding or waiting for each
+        self.graph_locks: Dict[int, List] = {}
+        self.lock = Lock()
+
+        self.ontology_version = self.load_ontology(ontology_paths)
+
+    @staticmethod
+    def graph_name(hash_id: int) -> NamedNode:
+        return NamedNode(f"{GRAPH_PREFIX}{hash_id}")
+
+    @staticmethod
+    def inferred_graph_name(hash_id: int) -> NamedNode:
+        return NamedNode(f"{GRAPH_PREFIX}{hash_id}:inferred")
+
+    def load_ontology(self, ontology_paths: Iterable[str]) -> str:
+        """
+        Loads the ontology, unless the same files were loaded before
+
+        :param ontology_paths: Turtle or N-Triples files
+        :type ontology_paths: list
+        :return: version of the ontology, a digest of its files
+        :rtype: str
+        """
+        digest = sha256()
+        ontologies = []
+        for ontology_path in ontology_paths:
+            with open(ontology_path, "rb") as ontology_file:
+                content = ontology_file.read()
+            digest.update(content)
+            ontologies.append((ontology_path, content))
+        version = digest.hexdigest()
+
+        marker = Quad(ONTOLOGY_GRAPH, LOADED_PREDICATE, Literal(version), CATALOG_GRAPH)
+        if marker in self.store:
+            return version
+
+        for stale in list(self.store.quads_for_pattern(ONTOLOGY_GRAPH, LOADED_PREDICATE, None, CATALOG_GRAPH)):
+            self.store.remove(stale)
+        self.store.remove_graph(ONTOLOGY_GRAPH)
+
+        for ontology_path, content in ontologies:
+            graph_type = type_for_extension(ontology_path.rsplit(".", 1)[-1]) or "turtle"
+            self.store.load(BytesIO(content), GRAPH_TYPES[graph_type], to_graph=ONTOLOGY_GRAPH)
+        self.store.add(marker)
+
+        return version
+
+    @contextmanager
+    def locked(self, hash_id: int) -> Iterator[None]:
+        # Writes to a graph check what's stored before writing it, so concurrent writes to the same graph are serialized
+        with self.lock:
+            graph_lock = self.graph_locks.setdefault(hash_id, [Lock(), 0])
+            graph_lock[1] += 1
+        try:
+            with graph_lock[0]:
+                yield
+        finally:
+            with self.lock:
+                graph_lock[1] -= 1
+                if graph_lock[1] == 0:
+                    del self.graph_locks[hash_id]
+
+    def stored(self) -> Set[NamedNode]:
+        # Names of the fully loaded graphs, and of the graphs inferred with the current ontology
+        names = {quad.subject for quad in self.store.quads_for_pattern(None, LOADED_PREDICATE, None, CATALOG_GRAPH)}
+        names.update(quad.subject for quad in self.store.quads_for_pattern(None, INFERRED_PREDICATE, Literal(self.ontology_version), CATALOG_GRAPH))
+        return names
+
+    def contains(self, hash_id: int) -> bool:
+        marker = self.store.quads_for_pattern(self.graph_name(hash_id), LOADED_PREDICATE, None, CATALOG_GRAPH)
+        return next(marker, None) is not None
+
+    def add(self, hash_id: int, content: IO[bytes], mime_type: str = "text/turtle") -> None:
+        """
+        Loads a graph into the store, streaming it from a file rather than holding it in
+        memory. Bulk loads aren't transactional, so the content must already be known to
+        parse, but the graph is only marked as loaded once it has been fully written
+
+        :param hash_id: hash of the graph content
+        :type hash_id: int
+        :param content: serialized graph, positioned at its start
+        :type content: file
+        :param mime_type: MIME type of the serialization
+        :type mime_type: str
+        """
+        with self.locked(hash_id):
+            if self.contains(hash_id):
+                return
+
+            # Clears what an interrupted load may have left behind
+            graph_name = self.graph_name(hash_id)
+            self.store.remove_graph(graph_name)
+            self.store.bulk_load(content, mime_type, to_graph=graph_name)
+            self.store.add(Quad(graph_name, LOADED_PREDICATE, Literal("true"), CATALOG_GRAPH))
+
+    def ensure(self, hash_id: int, read_content: Callable[[], bytes], mime_type: str = "text/turtle") -> NamedNode:
+        # Graphs uploaded before the store existed are loaded the first time they're used
+        if not self.contains(hash_id):
+            self.add(hash_id, BytesIO(read_content()), mime_type)
+        return self.graph_name(hash_id)
+
+    def infer(self, hash_id: int) -> NamedNode:
+        """
+        Materializes the `rdfs:subClassOf` closure of a loaded graph's classes, and the
+        `rdf:type`s its instances have through it, into a separate named graph. Querying
+        the union of both graphs answers `rdf:type/rdfs:subClassOf*` with a lookup
+
+        :param hash_id: hash of the graph content
+        :type hash_id: int
+        :return: named graph of the inferred triples
+        :rtype: NamedNode
+        """
+        graph_name = self.graph_name(hash_id)
+        inferred_graph_name = self.inferred_graph_name(hash_id)
+
+        # Inferred from the graph as a whole, so a load of it that is still running is waited for
+        with self.locked(hash_id):
+            marker = Quad(inferred_graph_name, INFERRED_PREDICATE, Literal(self.ontology_version), CATALOG_GRAPH)
+            if marker in self.store:
+                return inferred_graph_name
+
+            # Graphs inferred with an older ontology are inferred again
+            for stale in list(self.store.quads_for_pattern(inferred_graph_name, INFERRED_PREDICATE, None, CATALOG_GRAPH)):
+                self.store.remove(stale)
+            self.store.remove_graph(inferred_graph_name)
+
+            # Hierarchies come from the graph and the ontology, but only the graph's own instances are typed
+            dataset = f"USING <{graph_name.value}> USING <{ONTOLOGY_GRAPH.value}> USING NAMED <{graph_name.value}>"
+            self.store.update(f"""
+                INSERT {{ GRAPH <{inferred_graph_name.value}> {{ ?class <{RDFS_SUBCLASS_OF.value}> ?superclass }} }}
+                {dataset}
+                WHERE {{
+                    {{ SELECT DISTINCT ?class WHERE {{ GRAPH <{graph_name.value}> {{ ?instance <{RDF_TYPE.value}> ?class }} }} }}
+                    ?class <{RDFS_SUBCLASS_OF.value}>+ ?superclass
+                }}
+            """)
+            self.store.update(f"""
+                INSERT {{ GRAPH <{inferred_graph_name.value}> {{ ?instance <{RDF_TYPE.value}> ?superclass }} }}
+                USING <{inferred_graph_name.value}> USING NAMED <{graph_name.value}>
+                WHERE {{
+                    GRAPH <{graph_name.value}> {{ ?instance <{RDF_TYPE.value}> ?class }}
+                    ?class <{RDFS_SUBCLASS_OF.value}> ?superclass
+                    FILTER NOT EXISTS {{ GRAPH <{graph_name.value}> {{ ?instance <{RDF_TYPE.value}> ?superclass }} }}
+                }}
+            """)
+            self.store.add(marker)
+
+        return inferred_graph_name
+
+    def checkpoint(self, path: str) -> None:
+        """
+        Writes a consistent copy of the store that another process can open. Its data
+        files are hard links to the store's own, which are never modified, so a
+        checkpoint is quick to take and its pages are shared with the store's
+
+        :param path: directory of the checkpoint, which must not exist yet
+        :type path: str
+        """
+        self.store.flush()
+        self.store.backup(path)
+
+    def count(self, hash_id: int) -> int:
+        # Counted by the query engine, without a Python object per quad
+        solutions = self.store.query(f"SELECT (COUNT(*) AS ?count) WHERE {{ GRAPH <{self.graph_name(hash_id).value}> {{ ?s ?p ?o }} }}")
+        return int(next(solutions)["count"].value)
+
+    def quads(self, hash_id: int) -> Iterator[Quad]:
+        # Quads are returned in the default graph, as they were uploaded
+        for quad in self.store.quads_for_pattern(None, None, None, self.graph_name(hash_id)):
+            yield Quad(quad.subject, quad.predicate, quad.object)
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from secrets import token_urlsafe
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Optional
+import time
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class Job:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.state = QUEUED
+        # Step of the work currently running, reported to clients polling the job
+        self.stage: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.done = Event()
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the job has finished
+
+        :param timeout: seconds to wait for, or `None` to wait indefinitely
+        :type timeout: float or None
+        :return: whether the job finished in time
+        :rtype: bool
+        """
+        return self.done.wait(timeout)
+
+class JobQueue:
+    def __init__(self, workers: int = 4, retention: float = 3600.0):
+        """
+        Runs work in the background on a pool of threads, keeping each job's state
+        around for a while after it finishes so clients can poll for it
+
+        :param workers: number of jobs run at once
+        :type workers: int
+        :param retention: seconds finished jobs are kept for
+        :type retention: float
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self.lock = Lock()
+
+    def submit(self, work: Callable[[Job], Any]) -> Job:
+        """
+        Queues work, which is passed its own job so it can report its stage
+
+        :param work: function run in the background, whose return value becomes the job's result
+        :type work: callable
+        :return: the queued job
+        :rtype: Job
+        """
+        job = Job(token_urlsafe(16))
+
+        with self.lock:
+            self.prune()
+            self.jobs[job.job_id] = job
+
+        self.executor.submit(self.run, job, work)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def run(self, job: Job, work: Callable[[Job], Any]) -> None:
+        job.state = RUNNING
+        try:
+            job.result = work(job)
+            job.state = SUCCEEDED
+        except Exception as e:
+            job.error = e
+            job.state = FAILED
+        finally:
+            job.finished = time.time()
+            job.done.set()
+
+    def prune(self) -> None:
+        # Called with `lock` held
+        expired = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished != None and job.finished < expired]:
+            del self.jobs[job_id]
@@ -0,0 +1,59 @@
+from sqlalchemy import Table, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from typing import List
+
+# `db.create_all()` only creates missing tables, so columns added to a model later are added here
+
+def add_missing_columns(engine: Engine, table: Table) -> List[str]:
+    """
+    Adds the columns of `table` that are missing from its existing database table
+
+    Added columns must be nullable or have a server default, as existing rows need a value
+
+    :param engine: engine of the database holding the table
+    :type engine: Engine
+    :param table: table as declared by its model
+    :type table: Table
+    :return: names of the columns that were added
+    :rtype: list
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+
+    added = []
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            column_definition = CreateColumn(column).compile(dialect=engine.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_definition}")
+            added.append(column.name)
+
+    return added
+
+def add_missing_indexes(engine: Engine, table: Table) -> None:
+    """
+    Creates the indexes of `table` that are missing from its existing database table
+
+    :param engine: engine of the database holding the table
+    :type engine: Engine
+    :param table: table as declared by its model
+    :type table: Table
+    """
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def missing_indexes(engine: Engine, table: Table) -> List[str]:
+    """
+    Lists the indexes of `table` that are missing from its existing database table
+
+    :param engine: engine of the database holding the table
+    :type engine: Engine
+    :param table: table as declared by its model
+    :type table: Table
+    :return: names of the missing indexes
+    :rtype: list
+    """
+    existing = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+    return [index.name for index in table.indexes if index.name not in existing]
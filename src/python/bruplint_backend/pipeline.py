@@ -0,0 +1,418 @@
+from cache import LruByteCache
+from hashlib import sha256
+from io import BytesIO
+from pyoxigraph import NamedNode, Quad, QuerySolutions, QueryTriples, Store
+from sparql import normalize_query, query_form, rewrite_type_paths
+from terms import TermTable, TermTableCache
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+import json
+import re
+
+# Placeholder used by the frontend for the missing endpoint of a partially matched quad
+NULL_NODE = NamedNode("null://")
+
+RDF_TYPE = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
+RDFS_SUBCLASS_OF = NamedNode("http://www.w3.org/2000/01/rdf-schema#subClassOf")
+
+# Types inferred for the unfiltered graph, which SPARQL transforms opt into with `"inferred": true`
+class Inference(NamedTuple):
+    store: Store
+    # Named graph of `store` materialized by `GraphStore.infer()`
+    graph: NamedNode
+
+def load_nquads(content: bytes) -> Store:
+    store = Store()
+    store.load(BytesIO(content), "application/n-quads")
+    return store
+
+def dump_nquads(store: Store) -> bytes:
+    """
+    Serializes every graph of a store as N-Quads, so the `NULL_NODE` placeholders of
+    partially matched quads are kept along with the default graph
+
+    :param store: store to serialize
+    :type store: Store
+    :return: N-Quads-formatted dataset
+    :rtype: bytes
+    """
+    output = BytesIO()
+    store.dump(output, "application/n-quads")
+    return output.getvalue()
+
+def copy_store(quads: Iterable[Quad]) -> Store:
+    store = Store()
+    for quad in quads:
+        store.add(quad)
+    return store
+
+# Transforms read either a whole (in-memory) store, or a single named graph of the persistent graph store
+def read_quads(store: Store, graph: Optional[NamedNode] = None) -> Iterator[Quad]:
+    if graph is None:
+        return store.quads_for_pattern(None, None, None, None)
+    return (
+        Quad(quad.subject, quad.predicate, quad.object)
+            for quad in store.quads_for_pattern(None, None, None, graph)
+    )
+
+def unchanged(store: Store, graph: Optional[NamedNode] = None) -> Store:
+    if graph is None:
+        return store
+    return copy_store(read_quads(store, graph))
+
+def with_inferred(store: Store, inference: Inference) -> Store:
+    # Stores output by earlier transforms only hold part of the graph, so only their own instances are typed
+    superclasses: Dict[Any, List[Any]] = {}
+    for quad in inference.store.quads_for_pattern(None, RDFS_SUBCLASS_OF, None, inference.graph):
+        superclasses.setdefault(quad.subject, []).append(quad.object)
+
+    inferred_store = copy_store(read_quads(store))
+    for quad in store.quads_for_pattern(None, RDF_TYPE, None, None):
+        for superclass in superclasses.get(quad.object, []):
+            inferred_store.add(Quad(quad.subject, RDF_TYPE, superclass))
+            inferred_store.add(Quad(quad.object, RDFS_SUBCLASS_OF, superclass))
+    return inferred_store
+
+# Mirrors `SparqlTransformElement.apply` in the frontend, returning `None` when the input is left unchanged
+def sparql_quads(store: Store, query: str, graph: Optional[NamedNode] = None, inference: Optional[Inference] = None, term_tables: Optional[TermTableCache] = None) -> Optional[Iterator[Quad]]:
+    query_store, default_graph = store, graph
+    if inference is not None:
+        # With inferred types, type paths become lookups instead of walks up the class hierarchy
+        query = rewrite_type_paths(query)
+        if graph is None:
+            query_store = with_inferred(store, inference)
+        else:
+            default_graph = [graph, inference.graph]
+
+    try:
+        if default_graph is None:
+            query_result = query_store.query(query)
+        else:
+            # Other users' graphs and the catalog share the store, so `GRAPH` patterns must not reach them
+            query_result = query_store.query(query, default_graph=default_graph, named_graphs=[])
+    except (SyntaxError, OSError, ValueError):
+        return None
+
+    if isinstance(query_result, QuerySolutions):
+        matching_node_ids = set()
+        for solution in query_result:
+            for solution_value in solution:
+                if solution_value is not None:
+                    matching_node_ids.add(solution_value.value)
+
+        if graph is not None and term_tables is not None:
+            # Only the quads incident to matched nodes are visited, through the stored graph's term table
+            table = term_tables.get(graph.value, read_quads(store, graph))
+            with_subject = table.incident(matching_node_ids, "subject")
+            with_object = table.incident(matching_node_ids, "object")
+            indexes = sorted(with_subject | with_object)
+            matches = zip(
+                table.quads(indexes),
+                (index in with_subject for index in indexes),
+                (index in with_object for index in indexes)
+            )
+        else:
+            matches = (
+                (quad, quad.subject.value in matching_node_ids, quad.object.value in matching_node_ids)
+                    for quad in read_quads(store, graph)
+            )
+
+        def matched_quads() -> Iterator[Quad]:
+            for quad, has_subject, has_object in matches:
+                if has_subject and has_object:
+                    yield quad
+                elif has_subject:
+                    yield Quad(quad.subject, NULL_NODE, NULL_NODE, NULL_NODE)
+                elif has_object:
+                    yield Quad(NULL_NODE, NULL_NODE, quad.object, NULL_NODE)
+        return matched_quads()
+    elif isinstance(query_result, QueryTriples):
+        return (Quad(triple.subject, triple.predicate, triple.object) for triple in query_result)
+    else:
+        # ASK queries don't have a concept of filtering
+        return None
+
+TERM_POSITIONS = ("subject", "predicate", "object")
+
+# Regexes found by the planner to match every term, as any string contains a match of them
+MATCH_ALL_REGEXES = ("", "^", ".*")
+
+# A regex transform, by its index in `View.transforms`. A `match_over` other than a term's position matches nothing
+class Filter(NamedTuple):
+    index: int
+    match_over: str
+    pattern: re.Pattern
+
+# A SPARQL transform (or the stage's input if `None`) followed by regex transforms, run as one pass into one store
+class Stage(NamedTuple):
+    sparql: Optional[int]
+    filters: List[Filter]
+
+class Plan(NamedTuple):
+    transforms: List[Mapping[str, Any]]
+    stages: List[Stage]
+    # Indexes of the transforms that can't change their input, with the reason why
+    dropped: List[Tuple[int, str]]
+
+def plan_pipeline(transforms: Iterable[Mapping[str, Any]]) -> Plan:
+    """
+    Plans how to run a view's transforms. Transforms that can't change their input are
+    dropped, and each run of regex transforms is fused with the SPARQL transform before
+    it, so their quads are filtered as they're produced and only one store is built per
+    stage. Regex transforms are never moved before a SPARQL transform, as the query's
+    results depend on all of its input
+
+    :param transforms: transforms as saved in `View.transforms`
+    :type transforms: list
+    :return: stages to run, in order
+    :rtype: Plan
+    """
+    transforms = list(transforms)
+    stages: List[Stage] = []
+    dropped: List[Tuple[int, str]] = []
+
+    for index, transform in enumerate(transforms):
+        if not transform.get("enabled"):
+            dropped.append((index, "disabled"))
+            continue
+
+        params = transform.get("params")
+        match transform.get("type"):
+            case "sparql":
+                if not isinstance(params.get("query"), str):
+                    dropped.append((index, "missing query"))
+                    continue
+                if query_form(normalize_query(params.get("query"))) == "ASK":
+                    # Whether or not it parses, an ASK query leaves its input unchanged
+                    dropped.append((index, "ask query"))
+                    continue
+                stages.append(Stage(index, []))
+            case "regex":
+                try:
+                    pattern = re.compile(params.get("regex"))
+                except (re.error, TypeError):
+                    dropped.append((index, "invalid regex"))
+                    continue
+                match_over = params.get("match_over")
+                if pattern.pattern in MATCH_ALL_REGEXES and match_over in TERM_POSITIONS:
+                    dropped.append((index, "matches everything"))
+                    continue
+                if not stages:
+                    stages.append(Stage(None, []))
+                stages[-1].filters.append(Filter(index, match_over, pattern))
+            case _:
+                # Unknown transforms are ignored, as they are when loaded by the frontend
+                dropped.append((index, "unknown type"))
+
+    return Plan(transforms, stages, dropped)
+
+def explain(plan: Plan) -> dict:
+    # Describes a plan for the API, with transforms referred to by their index in `View.transforms`
+    def describe(index: int) -> dict:
+        return {"index": index, "name": plan.transforms[index].get("name"), "type": plan.transforms[index].get("type")}
+
+    return {
+        "stages": [
+            {
+                "sparql": None if stage.sparql is None else describe(stage.sparql),
+                "filters": [dict(describe(regex_filter.index), match_over = regex_filter.match_over) for regex_filter in stage.filters]
+            } for stage in plan.stages
+        ],
+        "dropped": [dict(describe(index), reason = reason) for index, reason in plan.dropped]
+    }
+
+# Mirrors `RegexTransformElement.apply` in the frontend, which ignores `flags` when matching
+def filter_depths(quads: Iterable[Quad], filters: List[Filter]) -> Iterator[Tuple[Quad, int]]:
+    # Pairs each quad with how many of `filters`, in order, it passes. Each distinct term is searched once per filter, rather than once per quad it appears in
+    matches: Dict[Tuple[int, Any], bool] = {}
+
+    def depth(quad: Quad) -> int:
+        for index, regex_filter in enumerate(filters):
+            if regex_filter.match_over not in TERM_POSITIONS:
+                return index
+            term = getattr(quad, regex_filter.match_over)
+            match = matches.get((index, term))
+            if match is None:
+                match = matches[(index, term)] = regex_filter.pattern.search(term.value) is not None
+            if not match:
+                return index
+        return len(filters)
+
+    return ((quad, depth(quad)) for quad in quads)
+
+def table_depths(table: TermTable, filters: List[Filter]) -> Iterator[Tuple[Quad, int]]:
+    # As `filter_depths()`, but only visiting the quads of a stored graph that pass the first filter
+    prefixes = []
+    for end in range(1, len(filters) + 1):
+        if filters[end - 1].match_over not in TERM_POSITIONS:
+            break
+        prefixes.append(set(table.matching((regex_filter.match_over, regex_filter.pattern) for regex_filter in filters[:end])))
+    if not prefixes:
+        return iter(())
+
+    indexes = sorted(prefixes[0])
+    return (
+        (quad, sum(1 for prefix in prefixes if index in prefix))
+            for index, quad in zip(indexes, table.quads(indexes))
+    )
+
+def run_stage(store: Store, plan: Plan, stage: Stage, graph: Optional[NamedNode] = None, inference: Optional[Inference] = None, term_tables: Optional[TermTableCache] = None, skip: int = 0) -> Tuple[Store, List[Optional[bytes]]]:
+    """
+    Runs a stage in a single pass over its quads, also serializing the output of each
+    of its transforms so that later runs can resume from any of them
+
+    :param store: input of the stage, or of its transform at index `skip`
+    :type store: Store
+    :param plan: plan the stage is part of
+    :type plan: Plan
+    :param stage: stage to run
+    :type stage: Stage
+    :param graph: named graph of `store` holding the input, or `None` to use all of `store`
+    :type graph: NamedNode or None
+    :param inference: types inferred for the unfiltered graph, if available
+    :type inference: Inference or None
+    :param term_tables: term tables of stored graphs, reused when `graph` is filtered
+    :type term_tables: TermTableCache or None
+    :param skip: number of the stage's transforms (its SPARQL transform first) already applied to `store`
+    :type skip: int
+    :return: output of the stage, and the N-Quads-serialized output of each transform run, or `None` where that is the stage's input
+    :rtype: tuple
+    """
+    quads = None
+    ran_sparql = stage.sparql is not None and skip == 0
+    if ran_sparql:
+        params = plan.transforms[stage.sparql].get("params")
+        quads = sparql_quads(store, params.get("query"), graph, inference if params.get("inferred") else None, term_tables)
+    filters = stage.filters[max(0, skip - (stage.sparql is not None)):]
+    if quads is None and not filters:
+        return unchanged(store, graph), [None] if ran_sparql else []
+
+    if quads is None and graph is not None and term_tables is not None:
+        # Stored graphs never change, so their term tables are kept and later filters only index into them
+        depths = table_depths(term_tables.get(graph.value, read_quads(store, graph)), filters)
+    else:
+        depths = filter_depths(read_quads(store, graph) if quads is None else quads, filters)
+
+    # One output per filter, after the SPARQL transform's unless it left its input unchanged
+    first = 0 if ran_sparql and quads is not None else 1
+    lines: List[List[str]] = [[] for _ in range(len(filters) + 1)]
+    output = Store()
+    for quad, depth in depths:
+        line = f"{quad} .\n"
+        for level in range(first, depth + 1):
+            lines[level].append(line)
+        if depth == len(filters):
+            output.add(quad)
+
+    checkpoints = ["".join(level_lines).encode("utf-8") for level_lines in lines[1:]]
+    if ran_sparql:
+        checkpoints.insert(0, None if quads is None else "".join(lines[0]).encode("utf-8"))
+    return output, checkpoints
+
+def is_active(transform: Mapping[str, Any]) -> bool:
+    # Disabled and unknown transforms pass their input through untouched
+    return bool(transform.get("enabled")) and transform.get("type") in ("sparql", "regex")
+
+def prefix_keys(hash_id: int, transforms: Iterable[Mapping[str, Any]]) -> List[Hashable]:
+    """
+    Computes one cache key per prefix of the given (active) transforms. Names are
+    not part of the key, as they don't affect the output
+
+    :param hash_id: hash of the unfiltered graph
+    :type hash_id: int
+    :param transforms: active transforms, in order
+    :type transforms: list
+    :return: keys for the prefixes of length 1 through `len(transforms)`
+    :rtype: list
+    """
+    digest = sha256()
+    keys = []
+    for transform in transforms:
+        digest.update(json.dumps(
+            [transform.get("type"), transform.get("params")],
+            sort_keys = True,
+            separators = (',', ':')
+        ).encode("utf-8"))
+        digest.update(b"\n")
+        keys.append((hash_id, digest.hexdigest()))
+    return keys
+
+def kept_transforms(plan: Plan) -> List[int]:
+    # Indexes of the transforms run by a plan, in the order they're applied
+    kept: List[int] = []
+    for stage in plan.stages:
+        if stage.sparql is not None:
+            kept.append(stage.sparql)
+        kept.extend(regex_filter.index for regex_filter in stage.filters)
+    return kept
+
+def uses_inference(transforms: Iterable[Mapping[str, Any]]) -> bool:
+    return any(is_active(transform) and transform.get("type") == "sparql" and transform.get("params").get("inferred") for transform in transforms)
+
+def pipeline_key(hash_id: int, transforms: Iterable[Mapping[str, Any]], ontology_version: Optional[str] = None) -> str:
+    # Identifies the output of a whole pipeline, e.g. for use as an ETag
+    stages = [transform for transform in transforms if is_active(transform)]
+    keys = prefix_keys(hash_id, stages)
+    if not keys:
+        return str(hash_id)
+
+    # Types inferred for SPARQL transforms depend on the ontology they were inferred with
+    if uses_inference(stages) and ontology_version is not None:
+        return f"{hash_id}-{keys[-1][1][:32]}-{ontology_version[:16]}"
+    return f"{hash_id}-{keys[-1][1][:32]}"
+
+class PipelineRun(NamedTuple):
+    store: Store
+    plan: Plan
+    # Number of kept transforms (from the first) whose output was read from the cache rather than computed
+    reused: int
+
+def resume_pipeline(hash_id: int, transforms: Iterable[Mapping[str, Any]], source: Store, cache: LruByteCache, graph: Optional[NamedNode] = None, inference: Optional[Inference] = None, term_tables: Optional[TermTableCache] = None) -> PipelineRun:
+    """
+    Runs a view's transforms as planned by `plan_pipeline()`, resuming from the
+    longest cached prefix and caching the output of every transform computed along the
+    way. Outputs are keyed by the transforms before them, including those of SPARQL
+    transforms before their fused regexes, so when a transform is edited only it and
+    those after it are run again
+
+    :param hash_id: hash of the unfiltered graph
+    :type hash_id: int
+    :param transforms: transforms as saved in `View.transforms`
+    :type transforms: list
+    :param source: store holding the unfiltered graph, which is never modified
+    :type source: Store
+    :param cache: cache of N-Quads-serialized transform outputs
+    :type cache: LruByteCache
+    :param graph: named graph of `source` holding the unfiltered graph, or `None` to use all of `source`
+    :type graph: NamedNode or None
+    :param inference: types inferred for the unfiltered graph, if available
+    :type inference: Inference or None
+    :param term_tables: term tables of stored graphs, reused when `graph` is filtered
+    :type term_tables: TermTableCache or None
+    :return: filtered store, the plan it was run with and how many of its kept transforms were reused
+    :rtype: PipelineRun
+    """
+    plan = plan_pipeline(transforms)
+    keys = prefix_keys(hash_id, [plan.transforms[index] for index in kept_transforms(plan)])
+
+    reused, cached = cache.longest(keys)
+    if cached is None:
+        store = source
+    else:
+        store, graph = load_nquads(cached), None
+
+    position = 0
+    for stage in plan.stages:
+        length = (stage.sparql is not None) + len(stage.filters)
+        skip = min(max(reused - position, 0), length)
+        if skip < length:
+            store, checkpoints = run_stage(store, plan, stage, graph, inference, term_tables, skip)
+            graph = None
+            for offset, checkpoint in enumerate(checkpoints):
+                if checkpoint is not None:
+                    cache.put(keys[position + skip + offset], checkpoint)
+        position += length
+
+    return PipelineRun(unchanged(store, graph), plan, reused)
+
+def run_pipeline(hash_id: int, transforms: Iterable[Mapping[str, Any]], source: Store, cache: LruByteCache, graph: Optional[NamedNode] = None, inference: Optional[Inference] = None, term_tables: Optional[TermTableCache] = None) -> Store:
+    return resume_pipeline(hash_id, transforms, source, cache, graph, inference, term_tables).store
@@ -0,0 +1,227 @@
+from formats import serialize_quads, type_for_mime_type
+from io import StringIO
+from pyoxigraph import BlankNode, NamedNode, Quad, QuerySolutions, QueryTriples, Store
+from typing import Any, List, Optional, Union
+import csv
+import json
+import re
+
+# Media types of the SPARQL 1.1 query results formats
+RESULT_TYPES = {
+    "json": "application/sparql-results+json",
+    "csv": "text/csv",
+    "tsv": "text/tab-separated-values"
+}
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_SUBCLASS_OF = "http://www.w3.org/2000/01/rdf-schema#subClassOf"
+
+# Only IRIs can't contain whitespace or quotes, so anything else starting with `<` is an operator
+IRI = re.compile(r'<[^<>"{}|^`\\\x00-\x20]*>')
+PROLOGUE = re.compile(r'\s*(?:BASE\s*<[^>]*>|PREFIX\s*[^\s:]*:\s*<[^>]*>)', re.IGNORECASE)
+QUERY_FORM = re.compile(r'\s*(SELECT|ASK|CONSTRUCT|DESCRIBE)\b', re.IGNORECASE)
+PREFIX = re.compile(r'PREFIX\s*([^\s:]*):\s*<([^>]*)>', re.IGNORECASE)
+
+# Strings are matched first, so paths are never rewritten inside them
+TYPE_PATH = re.compile(
+    r'("""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')'
+    r'|(\^\s*)?(?<![\w:?$])(a|[A-Za-z_]?[\w.-]*:type|<[^<>\s]*>)\s*/\s*([A-Za-z_]?[\w.-]*:subClassOf|<[^<>\s]*>)\s*\*'
+)
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes the text of a query, so that queries differing only by whitespace and
+    comments share cache entries. Strings and IRIs are kept verbatim
+
+    :param query: SPARQL query
+    :type query: str
+    :return: equivalent query, with comments removed and whitespace collapsed
+    :rtype: str
+    """
+    normalized = []
+    pending_space = False
+    index = 0
+
+    while index < len(query):
+        character = query[index]
+
+        if character.isspace():
+            pending_space = True
+            index += 1
+            continue
+
+        if character == "#" and not query.startswith("\\", index - 1):
+            # Comments run to the end of the line, `\#` only occurs in prefixed names
+            end = query.find("\n", index)
+            index = len(query) if end == -1 else end
+            pending_space = True
+            continue
+
+        if pending_space and normalized:
+            normalized.append(" ")
+        pending_space = False
+
+        if character == "<":
+            iri = IRI.match(query, index)
+            if iri:
+                normalized.append(iri.group())
+                index = iri.end()
+                continue
+        elif character in ("'", '"'):
+            # Long strings are delimited by three quotes, and may contain single ones
+            delimiter = character * 3 if query.startswith(character * 3, index) else character
+            end = index + len(delimiter)
+            while end < len(query) and not query.startswith(delimiter, end):
+                end += 2 if query[end] == "\\" else 1
+            end = min(end + len(delimiter), len(query))
+            normalized.append(query[index:end])
+            index = end
+            continue
+
+        normalized.append(character)
+        index += 1
+
+    return "".join(normalized)
+
+def query_form(query: str) -> Optional[str]:
+    """
+    Finds which form a query has, without parsing it
+
+    :param query: SPARQL query
+    :type query: str
+    :return: `SELECT`, `ASK`, `CONSTRUCT` or `DESCRIBE`, or `None` if it isn't recognized
+    :rtype: str or None
+    """
+    index = 0
+    while True:
+        declaration = PROLOGUE.match(query, index)
+        if not declaration:
+            break
+        index = declaration.end()
+
+    form = QUERY_FORM.match(query, index)
+    if not form:
+        return None
+    return form.group(1).upper()
+
+def rewrite_type_paths(query: str) -> str:
+    """
+    Rewrites `rdf:type/rdfs:subClassOf*` paths into plain `rdf:type`, which is equivalent
+    when querying a graph together with its inferred graph (see `GraphStore.infer()`)
+
+    :param query: SPARQL query
+    :type query: str
+    :return: query with its type paths rewritten
+    :rtype: str
+    """
+    prefixes = {prefix: iri for prefix, iri in PREFIX.findall(query)}
+
+    def expand(term: str) -> Optional[str]:
+        if term == "a":
+            return RDF_TYPE
+        elif term.startswith("<"):
+            return term[1:-1]
+        prefix, local = term.split(":", 1)
+        if prefix not in prefixes:
+            return None
+        return prefixes[prefix] + local
+
+    def rewrite(match: re.Match) -> str:
+        # Inverse paths only invert `rdf:type`, so aren't equivalent
+        if match.group(1) != None or match.group(2) != None:
+            return match.group()
+        if expand(match.group(3)) == RDF_TYPE and expand(match.group(4)) == RDFS_SUBCLASS_OF:
+            return match.group(3)
+        return match.group()
+
+    return TYPE_PATH.sub(rewrite, query)
+
+def term_json(term: Any) -> dict:
+    if isinstance(term, NamedNode):
+        return {"type": "uri", "value": term.value}
+    elif isinstance(term, BlankNode):
+        return {"type": "bnode", "value": term.value}
+
+    literal = {"type": "literal", "value": term.value}
+    if term.language is not None:
+        literal["xml:lang"] = term.language
+    elif term.datatype.value != XSD_STRING:
+        literal["datatype"] = term.datatype.value
+    return literal
+
+def term_csv(term: Any) -> str:
+    if term is None:
+        return ""
+    elif isinstance(term, BlankNode):
+        return f"_:{term.value}"
+    return term.value
+
+def solutions_json(variables: List[str], solutions: QuerySolutions) -> bytes:
+    bindings = []
+    for solution in solutions:
+        binding = {}
+        for variable, value in zip(variables, solution):
+            if value is not None:
+                binding[variable] = term_json(value)
+        bindings.append(binding)
+
+    return json.dumps({
+        "head": {"vars": variables},
+        "results": {"bindings": bindings}
+    }).encode("utf-8")
+
+def solutions_csv(variables: List[str], solutions: QuerySolutions) -> bytes:
+    output = StringIO()
+    writer = csv.writer(output, lineterminator="\r\n")
+    writer.writerow(variables)
+    for solution in solutions:
+        writer.writerow([term_csv(value) for value in solution])
+    return output.getvalue().encode("utf-8")
+
+def solutions_tsv(variables: List[str], solutions: QuerySolutions) -> bytes:
+    # Values are written as in N-Triples, which escapes tabs and newlines
+    lines = ["\t".join(f"?{variable}" for variable in variables)]
+    for solution in solutions:
+        lines.append("\t".join("" if value is None else str(value) for value in solution))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def execute_query(store: Store, query: str, graph_name: Union[NamedNode, List[NamedNode]], mime_type: str) -> bytes:
+    """
+    Runs a query over a single graph of the store, serializing its results
+
+    :param store: store holding the graph
+    :type store: Store
+    :param query: SPARQL query
+    :type query: str
+    :param graph_name: named graph of the graph, which becomes the default graph, or a list of graphs to merge
+    :type graph_name: NamedNode or list(NamedNode)
+    :param mime_type: one of `RESULT_TYPES` for `SELECT`/`ASK` queries, or of `formats.GRAPH_TYPES` for `CONSTRUCT`/`DESCRIBE`
+    :type mime_type: str
+    :return: serialized results
+    :rtype: bytes
+    :raises SyntaxError: if the query is invalid
+    :raises ValueError: if the results can't be serialized as `mime_type`
+    """
+    # No other graph of the store is visible to the query, whatever its `FROM` and `GRAPH` clauses
+    results = store.query(query, default_graph=graph_name, named_graphs=[])
+
+    if isinstance(results, QueryTriples):
+        graph_type = type_for_mime_type(mime_type)
+        if graph_type == None:
+            raise ValueError(f"Graphs can't be serialized as {mime_type}")
+        return serialize_quads((Quad(triple.subject, triple.predicate, triple.object) for triple in results), graph_type)
+
+    if isinstance(results, QuerySolutions):
+        variables = [variable.value for variable in results.variables]
+        if mime_type == RESULT_TYPES["json"]:
+            return solutions_json(variables, results)
+        elif mime_type == RESULT_TYPES["csv"]:
+            return solutions_csv(variables, results)
+        elif mime_type == RESULT_TYPES["tsv"]:
+            return solutions_tsv(variables, results)
+        raise ValueError(f"Solutions can't be serialized as {mime_type}")
+
+    if mime_type != RESULT_TYPES["json"]:
+        raise ValueError(f"Booleans can't be serialized as {mime_type}")
+    return json.dumps({"head": {}, "boolean": results}).encode("utf-8")
@@ -0,0 +1,79 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from typing import Any, Dict, Mapping
+
+# Applied to every SQLite connection when it's opened. WAL lets readers carry on while a
+# view is being saved, and only syncing at checkpoints is still safe in WAL mode
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * (2 ** 20),
+    # Negative sizes are in KiB rather than pages
+    "cache_size": -64 * (2 ** 10),
+    # Writers wait for each other instead of failing with "database is locked"
+    "busy_timeout": 5000
+}
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == "sqlite"
+
+def is_sqlite_memory(uri: str) -> bool:
+    database = make_url(uri).database
+    return database == None or database in ("", ":memory:")
+
+def engine_options(uri: str, pool_size: int = 8, statement_cache_size: int = 256) -> Dict[str, Any]:
+    """
+    Picks the engine options for a database. SQLAlchemy opens a new connection for
+    every use of an SQLite file by default, which discards the pragmas and the cache of
+    prepared statements each time, so connections are pooled instead
+
+    :param uri: SQLAlchemy database URI
+    :type uri: str
+    :param pool_size: connections kept open, normally one per request thread
+    :type pool_size: int
+    :param statement_cache_size: prepared statements kept per SQLite connection
+    :type statement_cache_size: int
+    :return: keyword arguments of `create_engine()`
+    :rtype: dict
+    """
+    if not is_sqlite(uri):
+        # Connections to a server may be dropped while idle in the pool
+        return {"pool_size": pool_size, "pool_pre_ping": True}
+
+    if is_sqlite_memory(uri):
+        # Flask-SQLAlchemy shares a single connection, as each would otherwise have its own database
+        return {"connect_args": {"cached_statements": statement_cache_size}}
+
+    return {
+        "poolclass": QueuePool,
+        "pool_size": pool_size,
+        "max_overflow": pool_size,
+        # Pooled connections are handed between threads, but only ever used by one at a time
+        "connect_args": {
+            "check_same_thread": False,
+            "cached_statements": statement_cache_size
+        }
+    }
+
+def apply_sqlite_pragmas(dbapi_connection: Any, pragmas: Mapping[str, Any]) -> None:
+    """
+    Sets pragmas on a newly opened SQLite connection
+
+    :param dbapi_connection: `sqlite3` connection
+    :type dbapi_connection: sqlite3.Connection
+    :param pragmas: pragma values by name, see `SQLITE_PRAGMAS`
+    :type pragmas: dict
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Mapping[str, Any]) -> None:
+    # Must be installed before the engine first connects
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
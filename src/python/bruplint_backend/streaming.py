@@ -0,0 +1,113 @@
+from flask import Request, Response
+from sqlalchemy import Column, func, select
+from sqlalchemy.engine import Engine
+from typing import Any, Callable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+def iter_blob(engine: Engine, column: Column, key_column: Column, key: Any, start: int, stop: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Reads `column[start:stop]` of the row where `key_column == key` in chunks, without
+    loading the whole value into memory. SQLite's incremental blob I/O is used when
+    available, otherwise the value is sliced with `substr` one chunk at a time
+
+    :param engine: engine of the database holding the value
+    :type engine: Engine
+    :param column: column holding the value
+    :type column: Column
+    :param key_column: primary key column of the row
+    :type key_column: Column
+    :param key: primary key of the row
+    :type key: Any
+    :param start: first byte to read
+    :type start: int
+    :param stop: byte to stop reading at (exclusive)
+    :type stop: int
+    :param chunk_size: maximum size of each yielded chunk
+    :type chunk_size: int
+    :return: iterator of chunks
+    :rtype: iter(bytes)
+    """
+    if engine.dialect.name == "sqlite":
+        connection = engine.raw_connection()
+        try:
+            dbapi_connection = getattr(connection, "dbapi_connection", None) or connection.connection
+            if hasattr(dbapi_connection, "blobopen"):
+                table = column.table.name
+                cursor = dbapi_connection.execute(
+                    f"SELECT rowid FROM {table} WHERE {key_column.name} = ?",
+                    (key,)
+                )
+                row = cursor.fetchone()
+                # An unfinished statement would otherwise keep holding a read lock
+                cursor.close()
+                if row is None:
+                    return
+
+                with dbapi_connection.blobopen(table, column.name, row[0], readonly=True) as blob:
+                    blob.seek(start)
+                    position = start
+                    while position < stop:
+                        chunk = blob.read(min(chunk_size, stop - position))
+                        if not chunk:
+                            break
+                        position += len(chunk)
+                        yield chunk
+                return
+        finally:
+            connection.close()
+
+    with engine.connect() as connection:
+        position = start
+        while position < stop:
+            # `substr` is 1-indexed
+            chunk = connection.execute(
+                select(func.substr(column, position + 1, min(chunk_size, stop - position)))
+                    .where(key_column == key)
+            ).scalar()
+            if not chunk:
+                break
+            position += len(chunk)
+            yield bytes(chunk)
+
+def ranged_response(request: Request, size: int, read_range: Callable[[int, int], Iterator[bytes]], content_type: str, etag: Optional[str] = None) -> Response:
+    """
+    Creates a streamed response for a body of a known size, honouring single-range
+    `Range` requests (and `If-Range`, when the body has an ETag)
+
+    :param request: request being answered
+    :type request: Request
+    :param size: total size of the body, in bytes
+    :type size: int
+    :param read_range: returns an iterator over the body's bytes from `start` to `stop`
+    :type read_range: callable
+    :param content_type: MIME type of the body
+    :type content_type: str
+    :param etag: strong ETag of the body, if any
+    :type etag: str or None
+    :return: a 200, 206 or 416 response
+    :rtype: Response
+    """
+    start, stop, status = 0, size, 200
+
+    # A range is only valid for the representation named by `If-Range`
+    if_range = request.if_range
+    range_valid = (if_range.etag == None and if_range.date == None) or (etag != None and if_range.etag == etag)
+
+    # Multiple ranges are not supported, so the full body is sent instead
+    if range_valid and request.range != None and len(request.range.ranges) == 1:
+        byte_range = request.range.range_for_length(size)
+        if byte_range == None:
+            response = Response(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+
+        start, stop = byte_range
+        status = 206
+
+    response = Response(read_range(start, stop), status=status, content_type=content_type, direct_passthrough=True)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Length"] = str(stop - start)
+    if status == 206:
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    return response
@@ -0,0 +1,207 @@
+from array import array
+from collections import OrderedDict
+from pyoxigraph import DefaultGraph, Quad
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+import re
+
+# NumPy is optional, term ids are selected with plain loops when it isn't installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+POSITIONS = ("subject", "predicate", "object", "graph_name")
+
+class TermTable:
+    def __init__(self, quads: Iterable[Quad]):
+        """
+        Dictionary-encodes a graph: every distinct term gets an integer id, and each
+        position of the quads becomes an array of those ids. Tests on terms can then be
+        run once per distinct term, and applied to every quad through the arrays
+
+        :param quads: quads of the graph
+        :type quads: iter(Quad)
+        """
+        self.terms: List[Any] = []
+        ids: Dict[Any, int] = {}
+        columns = [array("q") for _ in POSITIONS]
+
+        for quad in quads:
+            for column, term in zip(columns, (quad.subject, quad.predicate, quad.object, quad.graph_name)):
+                term_id = ids.get(term)
+                if term_id is None:
+                    term_id = ids[term] = len(self.terms)
+                    self.terms.append(term)
+                column.append(term_id)
+
+        self.columns: Dict[str, Any] = dict(zip(POSITIONS, columns))
+        if numpy is not None:
+            self.columns = {position: numpy.frombuffer(column, dtype=numpy.int64) for position, column in self.columns.items()}
+
+        # Indexes are only built for the lookups that need them, see `incident()`
+        self.ids_by_value: Optional[Dict[str, List[int]]] = None
+        self.postings: Dict[str, Tuple[Any, Any]] = {}
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.columns["subject"])
+
+    def size(self) -> int:
+        # Approximate, only the id arrays are counted
+        arrays = list(self.columns.values()) + [array for posting in self.postings.values() for array in posting]
+        return sum(len(array) * array.itemsize for array in arrays)
+
+    def position_postings(self, position: str) -> Tuple[Any, Any]:
+        """
+        Indexes the quads by their term at `position`: the quads having term `i` there
+        are `order[offsets[i]:offsets[i + 1]]`
+
+        :param position: one of `POSITIONS`
+        :type position: str
+        :return: offsets and order
+        :rtype: tuple
+        """
+        with self.lock:
+            if position in self.postings:
+                return self.postings[position]
+
+            column = self.columns[position]
+            if numpy is not None:
+                order = numpy.argsort(column, kind="stable")
+                offsets = numpy.zeros(len(self.terms) + 1, dtype=numpy.int64)
+                numpy.cumsum(numpy.bincount(column, minlength=len(self.terms)), out=offsets[1:])
+            else:
+                # Counting sort, as term ids are dense
+                offsets = array("q", bytes(8 * (len(self.terms) + 1)))
+                for term_id in column:
+                    offsets[term_id + 1] += 1
+                for term_id in range(len(self.terms)):
+                    offsets[term_id + 1] += offsets[term_id]
+
+                order = array("q", bytes(8 * len(column)))
+                next_slot = offsets[:-1]
+                for index, term_id in enumerate(column):
+                    order[next_slot[term_id]] = index
+                    next_slot[term_id] += 1
+
+            self.postings[position] = (offsets, order)
+            return offsets, order
+
+    def incident(self, values: Iterable[str], position: str) -> Set[int]:
+        """
+        Finds the quads whose term at `position` has one of the given values, through
+        the index of that position, so only those quads are visited. Values are compared
+        as strings, so an IRI and a literal with the same text are both found
+
+        :param values: values of the terms, as in `term.value`
+        :type values: iter(str)
+        :param position: `subject` or `object`
+        :type position: str
+        :return: indexes of the quads
+        :rtype: set(int)
+        """
+        offsets, order = self.position_postings(position)
+
+        with self.lock:
+            if self.ids_by_value is None:
+                self.ids_by_value = {}
+                for term_id, term in enumerate(self.terms):
+                    if not isinstance(term, DefaultGraph):
+                        self.ids_by_value.setdefault(term.value, []).append(term_id)
+        ids_by_value = self.ids_by_value
+
+        indexes: Set[int] = set()
+        for value in values:
+            for term_id in ids_by_value.get(value, ()):
+                indexes.update(order[offsets[term_id]:offsets[term_id + 1]].tolist())
+        return indexes
+
+    def matching(self, filters: Iterable[Tuple[str, re.Pattern]]) -> Any:
+        """
+        Finds the quads whose terms match all of the given patterns, searching each
+        distinct term of a position once per pattern
+
+        :param filters: positions (`subject`, `predicate` or `object`), each with a compiled
+            regular expression their term must contain a match of
+        :type filters: iter(tuple)
+        :return: indexes of the matching quads, in order
+        :rtype: list(int) or numpy.ndarray
+        """
+        patterns: Dict[str, List[re.Pattern]] = {}
+        for position, pattern in filters:
+            patterns.setdefault(position, []).append(pattern)
+
+        def matches_all(term_id: int, position_patterns: List[re.Pattern]) -> bool:
+            value = self.terms[term_id].value
+            return all(pattern.search(value) is not None for pattern in position_patterns)
+
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            for position, position_patterns in patterns.items():
+                column = self.columns[position]
+                term_matches = numpy.zeros(len(self.terms), dtype=bool)
+                for term_id in numpy.unique(column):
+                    term_matches[term_id] = matches_all(term_id, position_patterns)
+                mask &= term_matches[column]
+            return numpy.flatnonzero(mask)
+
+        position_matches = []
+        for position, position_patterns in patterns.items():
+            column = self.columns[position]
+            term_matches = {term_id: matches_all(term_id, position_patterns) for term_id in set(column)}
+            position_matches.append((column, term_matches))
+        return [
+            index for index in range(len(self))
+                if all(term_matches[column[index]] for column, term_matches in position_matches)
+        ]
+
+    def quads(self, indexes: Iterable[int]) -> Iterator[Quad]:
+        terms = self.terms
+        subjects, predicates, objects, graph_names = (self.columns[position] for position in POSITIONS)
+        for index in indexes:
+            yield Quad(terms[subjects[index]], terms[predicates[index]], terms[objects[index]], terms[graph_names[index]])
+
+class TermTableCache:
+    def __init__(self, max_entries: int = 8):
+        """
+        Keeps the term tables of the most recently filtered stored graphs, which are
+        immutable so their tables never go stale
+
+        :param max_entries: maximum number of cached tables
+        :type max_entries: int
+        """
+        self.max_entries = max_entries
+        self.entries: OrderedDict[Hashable, TermTable] = OrderedDict()
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, quads: Iterable[Quad]) -> TermTable:
+        # `quads` is only read when the table isn't cached
+        with self.lock:
+            table = self.entries.get(key)
+            if table is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return table
+            self.misses += 1
+
+        table = TermTable(quads)
+
+        with self.lock:
+            self.entries[key] = table
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return table
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": sum(table.size() for table in self.entries.values()),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
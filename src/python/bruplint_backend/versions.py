@@ -0,0 +1,192 @@
+from collections import Counter
+from hashlib import sha256
+from io import BytesIO
+from pyoxigraph import BlankNode, DefaultGraph, NamedNode, Quad, Store, parse, serialize
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+# Values of `Graph.kind`: snapshots store a whole graph, deltas only what changed since their parent
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+# Deltas are N-Quads, with the triples added and removed since the parent in these graphs
+ADDED_GRAPH = NamedNode("urn:bruplint:delta:added")
+REMOVED_GRAPH = NamedNode("urn:bruplint:delta:removed")
+
+# Blank nodes are relabelled whenever a graph is parsed, so are matched across versions by their neighbourhood
+SKOLEM_PREFIX = "urn:bruplint:bnode:"
+
+GraphName = Union[NamedNode, DefaultGraph]
+
+def has_blank_node(quad: Quad) -> bool:
+    return isinstance(quad.subject, BlankNode) or isinstance(quad.object, BlankNode)
+
+def blank_node_labels(quads: Iterable[Quad]) -> Dict[BlankNode, str]:
+    """
+    Labels each blank node of a graph with a digest of the triples it appears in,
+    which is the same in every version where they are unchanged. Blank nodes sharing
+    a label with another node of the same graph can't be told apart, so are left
+    unlabelled, along with every blank node connected to them through other blank
+    nodes, as the quads linking them could only be stored with unlabelled nodes
+
+    :param quads: quads of the graph
+    :type quads: iter(Quad)
+    :return: labels of the blank nodes that could be labelled
+    :rtype: dict
+    """
+    def neighbour(term) -> str:
+        return "_" if isinstance(term, BlankNode) else str(term)
+
+    edges: Dict[BlankNode, list] = {}
+    blank_neighbours: Dict[BlankNode, List[BlankNode]] = {}
+    for quad in quads:
+        if isinstance(quad.subject, BlankNode):
+            edges.setdefault(quad.subject, []).append(f"> {quad.predicate} {neighbour(quad.object)}")
+        if isinstance(quad.object, BlankNode):
+            edges.setdefault(quad.object, []).append(f"< {neighbour(quad.subject)} {quad.predicate}")
+        if isinstance(quad.subject, BlankNode) and isinstance(quad.object, BlankNode):
+            blank_neighbours.setdefault(quad.subject, []).append(quad.object)
+            blank_neighbours.setdefault(quad.object, []).append(quad.subject)
+
+    labels = {
+        node: sha256("\n".join(sorted(node_edges)).encode("utf-8")).hexdigest()[:32]
+            for node, node_edges in edges.items()
+    }
+    occurrences = Counter(labels.values())
+
+    unlabelled = [node for node, label in labels.items() if occurrences[label] > 1]
+    labels = {node: label for node, label in labels.items() if occurrences[label] == 1}
+    while unlabelled:
+        for neighbour_node in blank_neighbours.get(unlabelled.pop(), []):
+            if labels.pop(neighbour_node, None) is not None:
+                unlabelled.append(neighbour_node)
+    return labels
+
+def skolemize(quad: Quad, labels: Dict[BlankNode, str]) -> Optional[Quad]:
+    # Returns `None` when the quad has a blank node that couldn't be labelled
+    terms = []
+    for term in (quad.subject, quad.object):
+        if isinstance(term, BlankNode):
+            if term not in labels:
+                return None
+            term = NamedNode(f"{SKOLEM_PREFIX}{labels[term]}")
+        terms.append(term)
+    return Quad(terms[0], quad.predicate, terms[1])
+
+def unskolemize(quad: Quad) -> Quad:
+    terms = []
+    for term in (quad.subject, quad.object):
+        if isinstance(term, NamedNode) and term.value.startswith(SKOLEM_PREFIX):
+            term = BlankNode(term.value[len(SKOLEM_PREFIX):])
+        terms.append(term)
+    return Quad(terms[0], quad.predicate, terms[1])
+
+def graph_changes(old_store: Store, old_graph: GraphName, new_store: Store, new_graph: GraphName) -> Iterator[Quad]:
+    """
+    Finds the triples removed from and added to a graph, in a single pass over each
+    version. Triples without blank nodes are looked up in the other version's index,
+    so only those with blank nodes are held in memory
+
+    :param old_store: store holding the earlier version
+    :type old_store: Store
+    :param old_graph: graph of `old_store` holding the earlier version
+    :type old_graph: NamedNode or DefaultGraph
+    :param new_store: store holding the later version, which may be `old_store`
+    :type new_store: Store
+    :param new_graph: graph of `new_store` holding the later version
+    :type new_graph: NamedNode or DefaultGraph
+    :return: removed triples in `REMOVED_GRAPH`, then added triples in `ADDED_GRAPH`,
+        with labelled blank nodes skolemized and unlabelled ones left as they are
+    :rtype: iter(Quad)
+    """
+    old_labels = blank_node_labels(old_store.quads_for_pattern(None, None, None, old_graph))
+    new_labels = blank_node_labels(new_store.quads_for_pattern(None, None, None, new_graph))
+
+    old_blank = {
+        skolemize(quad, old_labels)
+            for quad in old_store.quads_for_pattern(None, None, None, old_graph) if has_blank_node(quad)
+    }
+    new_blank = {
+        skolemize(quad, new_labels)
+            for quad in new_store.quads_for_pattern(None, None, None, new_graph) if has_blank_node(quad)
+    }
+
+    for quad in old_store.quads_for_pattern(None, None, None, old_graph):
+        if has_blank_node(quad):
+            # Unlabelled blank nodes can't be matched, so are always replaced
+            key = skolemize(quad, old_labels)
+            if key is None:
+                yield Quad(quad.subject, quad.predicate, quad.object, REMOVED_GRAPH)
+            elif key not in new_blank:
+                yield Quad(key.subject, key.predicate, key.object, REMOVED_GRAPH)
+        elif Quad(quad.subject, quad.predicate, quad.object, new_graph) not in new_store:
+            yield Quad(quad.subject, quad.predicate, quad.object, REMOVED_GRAPH)
+
+    for quad in new_store.quads_for_pattern(None, None, None, new_graph):
+        if has_blank_node(quad):
+            key = skolemize(quad, new_labels)
+            if key is None:
+                yield Quad(quad.subject, quad.predicate, quad.object, ADDED_GRAPH)
+            elif key not in old_blank:
+                yield Quad(key.subject, key.predicate, key.object, ADDED_GRAPH)
+        elif Quad(quad.subject, quad.predicate, quad.object, old_graph) not in old_store:
+            yield Quad(quad.subject, quad.predicate, quad.object, ADDED_GRAPH)
+
+def encode_delta(store: Store, parent_graph: NamedNode, child_graph: NamedNode) -> bytes:
+    """
+    Computes the changes between two graphs loaded into the same store
+
+    :param store: store holding both graphs
+    :type store: Store
+    :param parent_graph: named graph of the earlier version
+    :type parent_graph: NamedNode
+    :param child_graph: named graph of the later version
+    :type child_graph: NamedNode
+    :return: N-Quads-serialized delta, see `apply_delta()`
+    :rtype: bytes
+    """
+    # Unlabelled blank nodes of the parent are never reconstructed, so don't need removing
+    changes = (
+        quad for quad in graph_changes(store, parent_graph, store, child_graph)
+            if quad.graph_name != REMOVED_GRAPH or not has_blank_node(quad)
+    )
+
+    output = BytesIO()
+    serialize(changes, output, "application/n-quads")
+    return output.getvalue()
+
+def apply_delta(store: Store, parent_graph: NamedNode, delta: bytes) -> Iterator[Quad]:
+    """
+    Reconstructs a version from its parent and its delta. Blank nodes are matched by
+    their labels, so the version is reconstructed up to the renaming of blank nodes
+
+    :param store: store holding the parent
+    :type store: Store
+    :param parent_graph: named graph of the parent
+    :type parent_graph: NamedNode
+    :param delta: delta computed by `encode_delta()`
+    :type delta: bytes
+    :return: quads of the version, in the default graph
+    :rtype: iter(Quad)
+    """
+    removed = set()
+    added = []
+    for quad in parse(BytesIO(delta), "application/n-quads"):
+        triple = Quad(quad.subject, quad.predicate, quad.object)
+        if quad.graph_name == REMOVED_GRAPH:
+            removed.add(triple)
+        else:
+            added.append(triple)
+
+    labels = blank_node_labels(store.quads_for_pattern(None, None, None, parent_graph))
+    for quad in store.quads_for_pattern(None, None, None, parent_graph):
+        if has_blank_node(quad):
+            key = skolemize(quad, labels)
+            if key is not None and key not in removed:
+                yield unskolemize(key)
+        else:
+            triple = Quad(quad.subject, quad.predicate, quad.object)
+            if triple not in removed:
+                yield triple
+
+    for quad in added:
+        yield unskolemize(quad)
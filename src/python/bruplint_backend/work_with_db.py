@@ -1,5 +1,8 @@
+from storage import SQLITE_PRAGMAS, apply_sqlite_pragmas
+from typing import Any, Mapping, Optional
 import sqlite3
 import secrets
+import threading
 import user_graph
 
 user_schema = """
@@ -33,21 +36,44 @@ CREATE TABLE IF NOT EXISTS Filtered_Graphs (
 
 class DB:
     ### Init ###
-    def __init__(self, filename: str = ':memory:'):
+    def __init__(self, filename: str = ':memory:', pragmas: Optional[Mapping[str, Any]] = None):
         """
-        Creates a new Database
+        Creates a new Database. Each thread gets its own connection, so requests served
+        on different threads never share (or wait on) a single connection
 
         :param filename: location of database (defaults to in-memory)
         :type filename: str
+        :param pragmas: pragmas set on every connection (defaults to `storage.SQLITE_PRAGMAS`)
+        :type pragmas: dict
         """
         self.filename = filename
-        self.db = sqlite3.connect(filename)
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+        self.connections = threading.local()
+
+        # An in-memory database only exists within its connection, so that one is shared
+        self.shared = None
+        if filename == ':memory:':
+            self.shared = sqlite3.connect(filename, check_same_thread=False)
+            apply_sqlite_pragmas(self.shared, self.pragmas)
 
         # create tables
         self.db.execute(user_schema)
         self.db.execute(graph_schema)
         self.db.execute(filtered_graph_schema)
 
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Connections are opened the first time each thread uses the database
+        if self.shared is not None:
+            return self.shared
+
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.filename)
+            apply_sqlite_pragmas(connection, self.pragmas)
+            self.connections.connection = connection
+        return connection
+
     ########################
     ### Database Queries ###
     ########################
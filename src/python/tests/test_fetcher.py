@@ -0,0 +1,151 @@
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+from tempfile import TemporaryDirectory
+from threading import Lock, Thread
+import gzip
+import sys
+import time
+import unittest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "bruplint_backend"))
+
+from fetcher import FetchError, Fetcher
+
+BODY = b"<http://example.com/s> <http://example.com/p> <http://example.com/o> .\n" * 100
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def send_body(self, body: bytes, headers: dict = {}) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+            self.server.revalidations.append(self.headers.get("If-None-Match"))
+
+        if self.path == "/graph.ttl":
+            self.send_body(BODY)
+        elif self.path == "/etag.ttl":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send_body(BODY, {"ETag": '"v1"'})
+        elif self.path == "/slow.ttl":
+            time.sleep(0.5)
+            self.send_body(BODY)
+        elif self.path == "/trickle.ttl":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            for byte in range(len(BODY)):
+                self.wfile.write(BODY[byte:byte + 1])
+                self.wfile.flush()
+                time.sleep(0.05)
+        elif self.path == "/unsized.ttl":
+            # Without a `Content-Length`, the body only ends when the connection is closed
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(BODY)
+            self.close_connection = True
+        elif self.path == "/gzip.ttl":
+            self.send_body(gzip.compress(BODY), {"Content-Encoding": "gzip"})
+        elif self.path.startswith("/redirect/"):
+            remaining = int(self.path.rsplit("/", 1)[-1])
+            self.send_response(302)
+            self.send_header("Location", "/graph.ttl" if remaining == 0 else f"/redirect/{remaining - 1}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+class FetcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.daemon_threads = True
+        # Requests received by path, and the `If-None-Match` header of each request
+        self.server.requests = {}
+        self.server.revalidations = []
+        self.server.lock = Lock()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.cache = TemporaryDirectory()
+        self.fetcher = Fetcher(self.cache.name, connect_timeout=1.0, read_timeout=5.0, total_timeout=5.0)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache.cleanup()
+
+    def url(self, url_path: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}{url_path}"
+
+    def test_fetch(self) -> None:
+        fetched = self.fetcher.fetch(self.url("/graph.ttl"))
+        self.assertEqual(fetched.digest, sha256(BODY).hexdigest())
+        self.assertEqual(fetched.size, len(BODY))
+        with open(fetched.path, "rb") as body:
+            self.assertEqual(body.read(), BODY)
+
+    def test_total_timeout(self) -> None:
+        # Each byte arrives well within the read timeout, but the whole body would take seconds
+        fetcher = Fetcher(self.cache.name, read_timeout=5.0, total_timeout=0.5)
+        started = time.monotonic()
+        with self.assertRaises(FetchError):
+            fetcher.fetch(self.url("/trickle.ttl"))
+        self.assertLess(time.monotonic() - started, 3.0)
+
+    def test_max_size(self) -> None:
+        fetcher = Fetcher(self.cache.name, max_size=len(BODY) - 1)
+        # Rejected by its `Content-Length`, and while reading a body without one
+        with self.assertRaises(FetchError):
+            fetcher.fetch(self.url("/graph.ttl"))
+        with self.assertRaises(FetchError):
+            fetcher.fetch(self.url("/unsized.ttl"))
+
+    def test_revalidation(self) -> None:
+        first = self.fetcher.fetch(self.url("/etag.ttl"))
+        second = self.fetcher.fetch(self.url("/etag.ttl"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.revalidations, [None, '"v1"'])
+
+    def test_coalescing(self) -> None:
+        results = []
+        threads = [Thread(target=lambda: results.append(self.fetcher.fetch(self.url("/slow.ttl")))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.server.requests["/slow.ttl"], 1)
+
+    def test_content_encoding(self) -> None:
+        # `Content-Length` counts the compressed body, while the digest is of the decoded one
+        fetched = self.fetcher.fetch(self.url("/gzip.ttl"))
+        self.assertEqual(fetched.digest, sha256(BODY).hexdigest())
+
+    def test_redirects(self) -> None:
+        self.assertEqual(self.fetcher.fetch(self.url("/redirect/4")).digest, sha256(BODY).hexdigest())
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch(self.url("/redirect/5"))
+
+    def test_status(self) -> None:
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch(self.url("/missing.ttl"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -194,40 +194,51 @@ export default defineComponent({
 		getViews(){
 			if(!this.loggedIn) return;
 
-			fetch(`${this.view_location_options.hostname}/view/${this.current_user.username}/views.json`)
-				.then(response => response.json())
-				.then(json => (json as {username: string, views: {name: string, url: string}[]}).views)
-				.then(views => {
-					let inputOptions: Record<string, string> = {};
-					console.log(views)
-					for(let {name, url} of views.reverse()){
-						inputOptions[url] = name;
-					}
+			// Views are listed a page at a time, in order of name, and later pages are only fetched when asked for
+			let hostname = this.view_location_options.hostname;
+			let showViews = (page_url: string, views: {name: string, url: string}[]) => {
+				fetch(`${hostname}${page_url}`)
+					.then(response => response.json() as Promise<{username: string, views: {name: string, url: string}[], total: number, next: string | null}>)
+					.then(json => {
+						views = [...views, ...json.views];
 
-					return Swal.fire({
-						input: "select",
-						inputOptions,
-						preConfirm: (value: string): string => value,
-						showCancelButton: true,
-						text: "Load a previously saved view",
-						title: "My Views"
-					})
-				})
-				.then(result => {
-					if(result.isDismissed || result.value === undefined) return;
+						let inputOptions: Record<string, string> = {};
+						for(let {name, url} of views){
+							inputOptions[url] = name;
+						}
 
-					let result_match = result.value.match(/^\/view\/(?<username>[^\/]+)\/(?<series_name>[^\/]+)\/view.json/);
-					if(result_match !== null){
-						this.view_location_options.username = result_match.groups?.username ?? '';
-						this.view_location_options.series_name = result_match.groups?.series_name ?? '';
+						return Swal.fire({
+							denyButtonText: `More views (${views.length} of ${json.total})`,
+							input: "select",
+							inputOptions,
+							preConfirm: (value: string): string => value,
+							showCancelButton: true,
+							showDenyButton: json.next !== null,
+							text: "Load a previously saved view",
+							title: "My Views"
+						}).then(result => {
+							if(result.isDenied && json.next !== null){
+								showViews(json.next, views);
+								return;
+							}
+							if(result.isDismissed || result.value === undefined) return;
 
-						try{
-							window.history.pushState(null, '', `/view/${this.view_location_options.username}/${this.view_location_options.series_name}`);
-						}catch(e){}
+							let result_match = result.value.match(/^\/view\/(?<username>[^\/]+)\/(?<series_name>[^\/]+)\/view.json/);
+							if(result_match !== null){
+								this.view_location_options.username = result_match.groups?.username ?? '';
+								this.view_location_options.series_name = result_match.groups?.series_name ?? '';
 
-						this.requestLoad();
-					}
-				});
+								try{
+									window.history.pushState(null, '', `/view/${this.view_location_options.username}/${this.view_location_options.series_name}`);
+								}catch(e){}
+
+								this.requestLoad();
+							}
+						});
+					});
+			};
+
+			showViews(`/view/${this.current_user.username}/views.json`, []);
 		},
 		logOut(){
 			if(!this.loggedIn) return;
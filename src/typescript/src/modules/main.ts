@@ -29,6 +29,8 @@ let matching_set = new Set<vis.IdType>();
 let node_view: vis.DataView<vis.Node, "id">;
 let store: oxigraph.Store;
 let transformed_store: oxigraph.Store;
+// Output of each transform as last applied, so that only the first changed transform and those after it are re-applied
+let checkpoints: {transform: tf.TransformElement<util.TransformType>, key: string, store: oxigraph.Store}[] = [];
 
 function getAllNodeIds(store: oxigraph.Store): Set<vis.IdType>{
 	return new Set(
@@ -60,9 +62,16 @@ async function readAsText(file: File): Promise<string>{
 	});
 }
 
-function loadGraph(content: string){
+function checkpointKey(transform: tf.TransformElement<util.TransformType>): string{
+	// Names don't change what a transform outputs
+	let {name: _name, ...key} = transform.toTransform();
+	return JSON.stringify(key);
+}
+
+function loadGraph(content: string, mime_type: string = "text/turtle"){
 	store = new oxigraph.Store();
-	store.load(content, "text/turtle", null, null);
+	checkpoints = [];
+	store.load(content, mime_type, null, null);
 
 	let nodes = new vis.DataSet((store.query(`
 		SELECT DISTINCT ?node WHERE {
@@ -270,12 +279,15 @@ function loadFromJson(json: object, name: string){
 		});
 
 		if(util.isBrl(json)){
+			let mime_type = util.graphMimeType(json.graph.type) ?? "text/turtle";
 			util.loadBrl(json, window.view_location_options.hostname)
-				.then(loadGraph);
+				.then(content => loadGraph(content, mime_type));
 		}else{
 			switch(json.graph.type){
 				case "turtle":
-					loadGraph((json.graph.content as {data: string}).data);
+				case "n-triples":
+				case "n-quads":
+					loadGraph((json.graph.content as {data: string}).data, util.graphMimeType(json.graph.type)!);
 					break;
 				default:
 					util.toast.fire({
@@ -357,7 +369,8 @@ async function onFileUploaded(file: File, type?: "turtle" | "json"){
 }
 
 async function onLoad(hostname: string, username: string, series_name: string){
-	fetch(`${hostname}/view/${username}/${series_name}/view.json`)
+	// N-Triples parses faster than Turtle
+	fetch(`${hostname}/view/${username}/${series_name}/view.json?type=n-triples`)
 		.then(response => response.json() as object)
 		.then(json => loadFromJson(json, `${window.view_location_options.username}/${window.view_location_options.series_name}`));
 }
@@ -417,8 +430,8 @@ async function onSave(hostname: string, username: string, api_key: string){
 			},
 			method: "POST"
 		});
-	}).then(response => {
-		switch(response.status){
+	}).then(async response => {
+		switch(await ingestionStatus(response)){
 			case 200:
 			case 201:
 			case 204:
@@ -446,6 +459,25 @@ async function onSave(hostname: string, username: string, api_key: string){
 	}).catch(() => {});
 }
 
+// Views are saved in the background, so a 202 is followed by polling its job until it finishes
+async function ingestionStatus(response: Response): Promise<number>{
+	if(response.status !== 202) return response.status;
+
+	const job_url = new URL((await response.json() as {id: string}).id, new URL("/bruplint/job/", response.url));
+	job_url.pathname += ".json";
+
+	while(true){
+		await new Promise(resolve => setTimeout(resolve, 500));
+
+		const job = await fetch(job_url)
+			.then(job_response => job_response.json() as Promise<{state: string, status: util.Nullable<number>}>)
+			.catch(() => null);
+
+		if(job === null) return 500;
+		if(job.state === "succeeded" || job.state === "failed") return job.status ?? 500;
+	}
+}
+
 async function validateHost(hostname: string): Promise<boolean>{
 	try{
 		let url = new URL(`${hostname}/bruplint`);
@@ -464,12 +496,27 @@ async function main(){
 	util.onceTrue(() => window.applyTransforms !== undefined)
 		.then(() => {
 			window.applyTransforms.value = function(transforms: {value: tf.TransformElement<util.TransformType>}[]){
-				transformed_store = transforms
-					.map(({value}) => value)
+				let elements = transforms.map(({value}) => value);
+
+				let reused = 0;
+				for(let [index, transform] of elements.entries()){
+					let checkpoint = checkpoints[index];
+					if(
+						checkpoint === undefined ||
+						checkpoint.transform !== transform ||
+						checkpoint.key !== checkpointKey(transform)
+					) break;
+					reused++;
+				}
+				checkpoints = checkpoints.slice(0, reused);
+
+				transformed_store = elements
+					.slice(reused)
 					.reduce((current_store, transform) => {
 						let applied = transform.apply(current_store);
+						checkpoints.push({transform, key: checkpointKey(transform), store: applied});
 						return applied;
-					}, new oxigraph.Store(store.match(null, null, null, null)));
+					}, checkpoints[reused - 1]?.store ?? store);
 
 				matching_set = getAllNodeIds(transformed_store);
 				node_view.refresh();
@@ -24,11 +24,14 @@ export class SparqlTransformElement implements TransformElement<"sparql">{
 	constructor(
 		public query: string,
 		public name: string = '',
-		public enabled: boolean = true
+		public enabled: boolean = true,
+		// Only honoured by the server, but kept so that saving a view doesn't drop it
+		public inferred: boolean = false
 	){}
 
 	apply(store: oxigraph.Store): oxigraph.Store{
-		if(!this.enabled) return new oxigraph.Store(store.match(null, null, null, null));
+		// Transforms never modify their input, so disabled ones can pass it on without copying
+		if(!this.enabled) return store;
 
 		let query_result: util.QueryResults;
 
@@ -36,7 +39,7 @@ export class SparqlTransformElement implements TransformElement<"sparql">{
 			query_result = store.query(this.query) as util.QueryResults;
 		}catch(e){
 			this.query_type = null;
-			return new oxigraph.Store(store.match(null, null, null, null));
+			return store;
 		}
 
 		let match_store = new oxigraph.Store();
@@ -77,7 +80,7 @@ export class SparqlTransformElement implements TransformElement<"sparql">{
 			this.query_type = "boolean";
 			this.boolean_query_result = query_result;
 			// ASK queries don't have a concept of filtering
-			match_store = new oxigraph.Store(store.match(null, null, null, null));
+			match_store = store;
 		}else if(util.isQueryResultGraph(query_result)){
 			this.query_type = "graph";
 			match_store = new oxigraph.Store(query_result);
@@ -88,7 +91,7 @@ export class SparqlTransformElement implements TransformElement<"sparql">{
 	}
 
 	clone(): SparqlTransformElement{
-		return new SparqlTransformElement(this.query, this.name, this.enabled);
+		return new SparqlTransformElement(this.query, this.name, this.enabled, this.inferred);
 	}
 
 	toTransform(): util.SparqlTransform{
@@ -97,7 +100,8 @@ export class SparqlTransformElement implements TransformElement<"sparql">{
 			name: this.name,
 			enabled: this.enabled,
 			params: {
-				query: this.query
+				query: this.query,
+				...(this.inferred ? {inferred: true} : {})
 			}
 		};
 	}
@@ -130,7 +134,7 @@ export class RegexTransformElement implements TransformElement<"regex">{
 	){}
 
 	apply(store: oxigraph.Store): oxigraph.Store{
-		if(!this.enabled) return new oxigraph.Store(store.match(null, null, null, null));
+		if(!this.enabled) return store;
 
 		let match_store = new oxigraph.Store();
 
@@ -196,7 +200,8 @@ export function createTransformElement(transform: util.BasicTransform): util.Nul
 			return new SparqlTransformElement(
 				sparql_transform.params.query,
 				sparql_transform.name,
-				sparql_transform.enabled
+				sparql_transform.enabled,
+				sparql_transform.params.inferred ?? false
 			);
 		case "regex":
 			let regex_transform = transform as util.RegexTransform;
@@ -28,7 +28,9 @@ export type BasicTransform = {
 export type SparqlTransform = BasicTransform & {
 	type: "sparql",
 	params: {
-		query: string
+		query: string,
+		// Queries the graph together with its inferred types, when filtered by the server
+		inferred?: boolean,
 	}
 };
 
@@ -47,6 +49,19 @@ export type RegexTransform = BasicTransform & {
 export type Transform = BasicTransform & (SparqlTransform | RegexTransform);
 export type TransformType = Transform["type"];
 
+export function graphMimeType(type: string): Nullable<string>{
+	switch(type){
+		case "turtle":
+			return "text/turtle";
+		case "n-triples":
+			return "application/n-triples";
+		case "n-quads":
+			return "application/n-quads";
+		default:
+			return null;
+	}
+}
+
 export type Bru = {
 	format: "bru",
 	graph: {
@@ -70,7 +85,7 @@ export type ViewFormat = View["format"];
 
 export async function loadBrl(brl: Brl, hostname: string = window.origin): Promise<string>{
 	console.log("Loading Brl:", brl);
-	if(brl.graph.type !== "turtle") return "";
+	if(graphMimeType(brl.graph.type) === null) return "";
 
 	let url = (brl.graph.url[0] === '/') ? `${hostname}${brl.graph.url}` : brl.graph.url;
 	return fetch(url).then(response => response.text());
@@ -132,7 +147,8 @@ export function isTransformType(transform_type: string): transform_type is Trans
 export function isSparqlTransform(transform: any): transform is SparqlTransform{
 	return (
 		transform?.type === "sparql" &&
-		typeof transform?.params?.query === "string"
+		typeof transform?.params?.query === "string" &&
+		(transform?.params?.inferred === undefined || typeof transform?.params?.inferred === "boolean")
 	);
 }
 